@@ -8,16 +8,22 @@ Main entry point that initializes bot and registers all commands/handlers
 # You may obtain a copy of the License at https://www.gnu.org/licenses/agpl-3.0.en.html
 """
 import os
+import time
+import argparse
 import logging
 import discord
 from discord.ext import commands
 from database import Database
+from utils.log import configure_logging
+from utils.notifications import NotificationService
+from utils.user_resolver import UserResolver
+from utils.rp_pipeline import RPIngestPipeline
+from utils.permissions import PermissionService
 
-# Configure logging
-logging.basicConfig(
+# Configure logging (queue-based: stream I/O happens off the event loop)
+configure_logging(
     level=logging.INFO if os.getenv("ENV") == "prod" else logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
+    json_format=os.getenv("LOG_FORMAT") == "json"
 )
 logger = logging.getLogger('xp-bot')
 
@@ -37,16 +43,73 @@ if not TOKEN:
 # Initialize database
 db = Database()
 
+
+class XPBot(commands.Bot):
+    """Bot that owns the background services and writes back buffered state before disconnecting"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user_resolver = UserResolver(self)
+        self.notifications = NotificationService(self, db)
+        self.rp_pipeline = RPIngestPipeline(db, self.notifications)
+        self.permissions = PermissionService(db)
+        self._initialized = False
+        # Set from --force-sync: push slash commands even if their hash is unchanged
+        self.force_sync = False
+
+    async def setup_hook(self):
+        """One-time startup: database, schema, background tasks and command sync
+        Runs after login and before the gateway connects; unlike on_ready it doesn't repeat on reconnect"""
+        if self._initialized:
+            return
+
+        timings = {}
+        started = time.perf_counter()
+
+        phase_start = time.perf_counter()
+        await db.connect()
+        timings['db_connect'] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        await db.initialize_schema()
+        timings['schema'] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        await db.load_character_names()
+        timings['name_index'] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        start_tasks()
+        timings['tasks'] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        await sync_commands(self, db, force=self.force_sync)
+        timings['command_sync'] = time.perf_counter() - phase_start
+
+        self._initialized = True
+        phases = ", ".join(f"{phase}={elapsed * 1000:.1f}ms" for phase, elapsed in timings.items())
+        logger.info(f"Startup complete in {(time.perf_counter() - started) * 1000:.1f}ms ({phases})")
+
+    async def close(self):
+        try:
+            await stop_tasks()
+        except Exception as e:
+            logger.error(f"Failed to flush pending state on shutdown: {e}")
+        await super().close()
+        await db.close()
+
+
 # Initialize Discord bot
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.messages = True
-bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+bot = XPBot(command_prefix="!", intents=intents, help_command=None)
 
 # Import and register all components
-from handlers.events import setup_events
+from handlers.events import setup_events, sync_commands
 from handlers.errors import setup_error_handlers
+from handlers.tasks import setup_tasks
 from commands.character import setup_character_commands
 from commands.admin import setup_admin_commands
 from commands.info import setup_info_commands
@@ -56,6 +119,7 @@ from commands.dm_profile import setup_dm_profile_commands
 # Setup handlers and commands
 setup_events(bot, db, GUILD_ID)
 setup_error_handlers(bot)
+start_tasks, stop_tasks = setup_tasks(bot, db)
 setup_character_commands(bot, db, GUILD_ID)
 setup_admin_commands(bot, db, GUILD_ID)
 setup_info_commands(bot, db, GUILD_ID)
@@ -66,5 +130,11 @@ logger.info("All commands and handlers registered")
 
 # Run the bot
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="XP-Bot: Discord XP Tracking Bot")
+    parser.add_argument("--force-sync", action="store_true",
+                        help="sync slash commands even if they haven't changed since the last sync")
+    bot.force_sync = parser.parse_args().force_sync
+
     logger.info("Starting XP Bot...")
-    bot.run(TOKEN)
+    # log_handler=None keeps discord.py from adding its own blocking stream handler to the root logger
+    bot.run(TOKEN, log_handler=None)
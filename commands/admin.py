@@ -7,6 +7,7 @@ from discord import app_commands
 from discord.ext import commands
 from utils.validation import validate_xp_amount, validate_daily_cap
 from ui.views import XPSettingsView
+from utils.notifications import LevelUpEvent
 
 logger = logging.getLogger('xp-bot')
 
@@ -14,23 +15,6 @@ logger = logging.getLogger('xp-bot')
 def setup_admin_commands(bot, db, guild_id):
     """Register admin commands"""
 
-    async def has_character_creation_permission(interaction: discord.Interaction) -> bool:
-        """Check if user has permission to create characters (same for granting XP)"""
-        # Admins always have permission
-        if interaction.user.guild_permissions.administrator:
-            return True
-
-        # Check if user has any of the allowed roles
-        allowed_role_ids = await db.get_character_creation_roles(guild_id)
-
-        # If no roles configured, allow everyone
-        if not allowed_role_ids:
-            return True
-
-        # Check if user has any allowed role
-        user_role_ids = [role.id for role in interaction.user.roles]
-        return any(role_id in allowed_role_ids for role_id in user_role_ids)
-
     async def all_characters_autocomplete(interaction: discord.Interaction, current: str):
         """Autocomplete function for all character names (admin command)"""
         try:
@@ -54,7 +38,7 @@ def setup_admin_commands(bot, db, guild_id):
     @app_commands.checks.cooldown(10, 60.0, key=lambda i: i.user.id)
     async def xp_grant(interaction: discord.Interaction, character_name: str, amount: int, memo: str = None):
         # Check if user has permission to grant XP (same as character creation)
-        if not await has_character_creation_permission(interaction):
+        if not await bot.permissions.can_manage_characters(interaction, guild_id):
             await interaction.response.send_message(
                 "❌ You don't have permission to grant XP. Contact an administrator.",
                 ephemeral=True
@@ -80,15 +64,18 @@ def setup_admin_commands(bot, db, guild_id):
         character_id = char_data['id']
 
         # Award XP (bypassing daily caps since this is admin grant)
-        xp_result = await db.award_xp(user_id, char_name, amount)
+        xp_result = await db.award_xp_by_id(character_id, amount)
+        if not xp_result:
+            await interaction.response.send_message("❌ Character not found.", ephemeral=True)
+            return
 
         # Log the XP grant with memo
         await db.log_xp_grant(character_id, interaction.user.id, amount, memo)
 
-        # Get updated character info for notification
+        # Updated character row comes back from the award itself
         from utils.xp import get_level_and_progress
-        updated_char = await db.get_character(user_id, char_name)
-        new_xp = updated_char['xp']
+        updated_char = xp_result['character']
+        new_xp = xp_result['new_xp']
         new_level, progress, required = get_level_and_progress(new_xp)
 
         # Check if character leveled up
@@ -162,7 +149,7 @@ def setup_admin_commands(bot, db, guild_id):
 
         # Send DM to the character owner (always sent, in addition to level-up if applicable)
         try:
-            character_owner = await interaction.client.fetch_user(user_id)
+            character_owner = await interaction.client.user_resolver.resolve(user_id)
 
             # Create DM embed matching the log channel format
             from ui.character_view import DEFAULT_CHARACTER_IMAGE
@@ -226,131 +213,21 @@ def setup_admin_commands(bot, db, guild_id):
         except Exception as e:
             logger.warning(f"Could not send XP grant notification to user {user_id}: {e}")
 
-        # Send level-up notifications if character leveled up
+        # Level-up post and DM go out from the notification workers
         if leveled_up:
-            # Send level-up notification to log channel
-            if request_channel_id:
-                request_channel = bot.get_channel(request_channel_id)
-                if request_channel:
-                    try:
-                        from ui.character_view import DEFAULT_CHARACTER_IMAGE
-                        levelup_embed = discord.Embed(
-                            title=f"🎉 Level Up! - {char_name}",
-                            description=f"**{char_name}** has reached **Level {new_level}**!",
-                            color=discord.Color.gold(),
-                            timestamp=discord.utils.utcnow()
-                        )
-
-                        levelup_embed.add_field(
-                            name="**Player**",
-                            value=f"<@{user_id}>",
-                            inline=False
-                        )
-
-                        levelup_embed.add_field(
-                            name="**Previous Level**",
-                            value=str(old_level),
-                            inline=True
-                        )
-
-                        levelup_embed.add_field(
-                            name="**New Level**",
-                            value=str(new_level),
-                            inline=True
-                        )
-
-                        levelup_embed.add_field(
-                            name="**Total XP**",
-                            value=f"{new_xp:,}",
-                            inline=False
-                        )
-
-                        # Add character sheet link if available
-                        if updated_char.get('character_sheet_url'):
-                            levelup_embed.add_field(
-                                name="**Character Sheet**",
-                                value=f"[Update Your Sheet]({updated_char['character_sheet_url']})",
-                                inline=False
-                            )
-
-                        # Add character image
-                        image_url = updated_char.get("image_url") or DEFAULT_CHARACTER_IMAGE
-                        levelup_embed.set_thumbnail(url=image_url)
-
-                        levelup_embed.set_footer(text=f"Remember to update your character sheet!")
-
-                        await request_channel.send(embed=levelup_embed)
-                    except Exception as e:
-                        logger.error(f"Failed to post level-up notification: {e}")
-
-            # Send level-up DM
-            try:
-                character_owner = await interaction.client.fetch_user(user_id)
-
-                # Create rich embed for level-up DM
-                from ui.character_view import DEFAULT_CHARACTER_IMAGE
-                levelup_dm_embed = discord.Embed(
-                    title=f"🎉 Level Up! - {char_name}",
-                    description=f"**{char_name}** has leveled up from **Level {old_level}** to **Level {new_level}**!",
-                    color=discord.Color.gold(),
-                    timestamp=discord.utils.utcnow()
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**Player**",
-                    value=f"<@{user_id}>",
-                    inline=False
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**Old Level**",
-                    value=str(old_level),
-                    inline=True
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**New Level**",
-                    value=str(new_level),
-                    inline=True
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**New Total XP**",
-                    value=f"{new_xp:,}",
-                    inline=False
-                )
-
-                if memo:
-                    levelup_dm_embed.add_field(
-                        name="**Reason**",
-                        value=memo,
-                        inline=False
-                    )
-
-                if updated_char.get('character_sheet_url'):
-                    levelup_dm_embed.add_field(
-                        name="**Action Required**",
-                        value=f"Please update your [character sheet]({updated_char['character_sheet_url']}) to reflect your new level!",
-                        inline=False
-                    )
-                else:
-                    levelup_dm_embed.add_field(
-                        name="**Action Required**",
-                        value="Please update your character sheet to reflect your new level!",
-                        inline=False
-                    )
-
-                # Add character image
-                image_url = updated_char.get("image_url") or DEFAULT_CHARACTER_IMAGE
-                levelup_dm_embed.set_thumbnail(url=image_url)
-
-                levelup_dm_embed.set_footer(text=f"Granted by {interaction.user.display_name}")
-
-                await character_owner.send(embed=levelup_dm_embed)
-            except discord.Forbidden:
-                logger.warning(f"Could not send level-up DM to user {user_id} - DMs may be disabled")
-            except Exception as e:
-                logger.warning(f"Could not send level-up DM to user {user_id}: {e}")
+            bot.notifications.enqueue(LevelUpEvent(
+                user_id=user_id,
+                character_name=char_name,
+                old_level=old_level,
+                new_level=new_level,
+                new_xp=new_xp,
+                reason=memo,
+                image_url=updated_char.get('image_url'),
+                character_sheet_url=updated_char.get('character_sheet_url'),
+                channel_id=request_channel_id,
+                post_to_channel=bool(request_channel_id),
+                footer=f"Granted by {interaction.user.display_name}"
+            ))
 
         action = "Granted" if amount >= 0 else "Removed"
         response = f"✅ {action} {abs(amount)} XP {'to' if amount >= 0 else 'from'} **{char_name}** (user ID: {user_id})."
@@ -501,6 +378,136 @@ def setup_admin_commands(bot, db, guild_id):
 
         await interaction.response.send_message(embed=embed, view=XPSettingsView(bot, db, guild_id), ephemeral=True)
 
+    @bot.tree.command(name="xp_metrics", description="(Admin) Show cache and pipeline metrics")
+    @app_commands.checks.cooldown(3, 60.0, key=lambda i: i.user.id)
+    async def xp_metrics(interaction: discord.Interaction):
+        """Admin view of in-process cache hit rates and RP pipeline metrics"""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ Admin only.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="XP Bot Metrics", color=discord.Color.blurple())
+
+        for name, stats in db.cache_stats().items():
+            embed.add_field(
+                name=f"Cache: {name}",
+                value=f"Hits: {stats['hits']:,} | Misses: {stats['misses']:,} ({stats['hit_rate']:.1%})\nEntries: {stats['size']:,}",
+                inline=False
+            )
+
+        names = db.character_names.stats()
+        embed.add_field(
+            name="Character Name Index",
+            value=(
+                f"Characters: {names['size']:,} | Loaded: {'yes' if names['loaded'] else 'no'} | "
+                f"Reloads: {names['reloads']:,}\n"
+                f"Searches: {names['searches']:,} | Exact lookups: {names['lookups']:,}"
+            ),
+            inline=False
+        )
+
+        def fmt_ms(seconds):
+            return f"{seconds * 1000:.1f}ms" if seconds is not None else "n/a"
+
+        rp = bot.rp_pipeline.stats()
+        avg_batch = f"{rp['avg_batch_size']:.1f}" if rp['avg_batch_size'] is not None else "n/a"
+        embed.add_field(
+            name="RP Ingest",
+            value=(
+                f"Queue depth: {rp['queue_depth']:,}/{rp['queue_capacity']:,} | Overflow users: {rp['overflow_users']:,} "
+                f"(policy: {rp['overflow_policy']})\n"
+                f"Submitted: {rp['submitted']:,} | Overflowed: {rp['overflowed']:,} | Dropped: {rp['dropped']:,} | "
+                f"Errors: {rp['errors']:,}\n"
+                f"Batches: {rp['batches']:,} (size last {rp['last_batch_size']:,}, avg {avg_batch}, "
+                f"max {rp['max_batch_size']:,}) | DB rows: {rp['db_rows']:,}\n"
+                f"Lag: last {fmt_ms(rp['last_lag'])}, avg {fmt_ms(rp['avg_lag'])}, max {fmt_ms(rp['max_lag'])}"
+            ),
+            inline=False
+        )
+
+        buffers = db.pipeline_stats()['char_buffer']
+        embed.add_field(
+            name="RP Buffer (write-behind)",
+            value=(
+                f"Buffered: {buffers['buffered_messages']:,} | Synchronous: {buffers['sync_messages']:,}\n"
+                f"Dirty: {buffers['dirty']:,} | Snapshots: {buffers['snapshots']:,}\n"
+                f"Flushes: {buffers['flushes']:,} ({buffers['rows_flushed']:,} rows), "
+                f"every {buffers['flush_interval']:g}s"
+                + (f" (last gap {buffers['last_flush_gap']:.1f}s)" if buffers['last_flush_gap'] is not None else "")
+                + f"\nFlush latency: last {fmt_ms(buffers['last_flush_latency'])}, "
+                f"avg {fmt_ms(buffers['avg_flush_latency'])}, max {fmt_ms(buffers['max_flush_latency'])}"
+            ),
+            inline=False
+        )
+
+        users = bot.user_resolver.stats()
+        embed.add_field(
+            name="User Resolver",
+            value=(
+                f"Gateway: {users['gateway_hits']:,} | Cached: {users['cache_hits']:,} | "
+                f"Coalesced: {users['coalesced']:,} ({users['hit_rate']:.1%} without REST)\n"
+                f"REST calls: {users['rest_calls']:,} ({users['rest_errors']:,} errors) | Entries: {users['size']:,}"
+            ),
+            inline=False
+        )
+
+        notifications = bot.notifications.stats()
+        embed.add_field(
+            name="Notifications",
+            value=(
+                f"Queue depth: {notifications['queue_depth']:,} | Workers: {notifications['workers']}\n"
+                f"Enqueued: {notifications['enqueued']:,} | Sent: {notifications['sent']:,} | "
+                f"Failed: {notifications['failed']:,} | Dropped: {notifications['dropped']:,} | "
+                f"Retries: {notifications['retries']:,}\n"
+                f"Send latency: last {fmt_ms(notifications['last_send_latency'])}, "
+                f"avg {fmt_ms(notifications['avg_send_latency'])}, max {fmt_ms(notifications['max_send_latency'])}"
+            ),
+            inline=False
+        )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @bot.tree.command(name="xp_backfill_quest_snapshots", description="(Admin) Snapshot completed quests that don't have one")
+    @app_commands.checks.cooldown(1, 300.0, key=lambda i: i.user.id)
+    async def xp_backfill_quest_snapshots(interaction: discord.Interaction):
+        """Freeze snapshots for quests completed before snapshots existed"""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ Admin only.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        count = await db.backfill_quest_snapshots(guild_id)
+        await interaction.followup.send(f"✅ Snapshotted **{count}** completed quest(s).", ephemeral=True)
+        logger.info(f"Admin {interaction.user.id} backfilled {count} quest snapshots")
+
+    @bot.tree.command(name="xp_check_quest_counters", description="(Admin) Check quest participant/monster counters")
+    @app_commands.describe(repair="Reset drifted counters to the actual values")
+    @app_commands.checks.cooldown(1, 60.0, key=lambda i: i.user.id)
+    async def xp_check_quest_counters(interaction: discord.Interaction, repair: bool = False):
+        """Compare the denormalized quest counters with their source rows"""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ Admin only.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        drifted = await db.check_quest_counters(guild_id, repair=repair)
+        if not drifted:
+            await interaction.followup.send("✅ All quest counters are consistent.", ephemeral=True)
+            return
+
+        lines = []
+        for q in drifted[:20]:
+            lines.append(
+                f"**{q['name']}** (ID {q['id']}): participants {q['participant_count']}→{q['actual_participant_count']}, "
+                f"monsters {q['monster_count']}→{q['actual_monster_count']}, "
+                f"XP {q['total_monster_xp']:,}→{q['actual_total_monster_xp']:,}"
+            )
+        if len(drifted) > 20:
+            lines.append(f"_...and {len(drifted) - 20} more_")
+
+        header = f"🔧 Repaired {len(drifted)} quest(s):" if repair else f"⚠️ {len(drifted)} quest(s) out of sync (run with repair:True to fix):"
+        await interaction.followup.send(header + "\n" + "\n".join(lines), ephemeral=True)
+
     @bot.command(name="sync")
     async def sync(ctx):
         """Sync slash commands to the guild (legacy prefix command)"""
@@ -21,29 +21,11 @@ logger = logging.getLogger('xp-bot')
 def setup_character_commands(bot, db, guild_id):
     """Register character management commands"""
 
-    async def has_character_creation_permission(interaction: discord.Interaction) -> bool:
-        """Check if user has permission to create characters"""
-        # Admins always have permission
-        if interaction.user.guild_permissions.administrator:
-            return True
-
-        # Check if user has any of the allowed roles
-        allowed_role_ids = await db.get_character_creation_roles(guild_id)
-
-        # If no roles configured, allow everyone
-        if not allowed_role_ids:
-            return True
-
-        # Check if user has any allowed role
-        user_role_ids = [role.id for role in interaction.user.roles]
-        return any(role_id in allowed_role_ids for role_id in user_role_ids)
-
     async def character_autocomplete(interaction: discord.Interaction, current: str):
         """Autocomplete function for user's character names"""
         try:
-            user_id = interaction.user.id
-            await db.ensure_user(user_id)
-            characters = await db.list_characters(user_id)
+            # Cached narrow list - typing costs at most one small query per user per TTL
+            characters = await db.get_character_summaries(interaction.user.id)
 
             # Filter characters based on what user is typing
             char_names = [char['name'] for char in characters]
@@ -123,7 +105,7 @@ def setup_character_commands(bot, db, guild_id):
             return
 
         # Check if user has permission to create characters
-        if not await has_character_creation_permission(interaction):
+        if not await bot.permissions.can_manage_characters(interaction, guild_id):
             await interaction.response.send_message(
                 "❌ You don't have permission to create characters. Contact an administrator.",
                 ephemeral=True
@@ -201,7 +183,7 @@ def setup_character_commands(bot, db, guild_id):
 
             # Send DM to the character owner
             try:
-                character_owner = await interaction.client.fetch_user(target_user_id)
+                character_owner = await interaction.client.user_resolver.resolve(target_user_id)
                 dm_message = (
                     f"✅ Your character **{char_name}** has been created!\n"
                     f"Starting XP: {starting_xp:,}\n"
@@ -290,12 +272,8 @@ def setup_character_commands(bot, db, guild_id):
         """Autocomplete function for all character names (admin command for retiring)"""
         try:
             # Check if user has character creation permission (same as granting XP)
-            if not interaction.user.guild_permissions.administrator:
-                allowed_role_ids = await db.get_character_creation_roles(guild_id)
-                if allowed_role_ids:
-                    user_role_ids = [role.id for role in interaction.user.roles]
-                    if not any(role_id in allowed_role_ids for role_id in user_role_ids):
-                        return []
+            if not await bot.permissions.can_manage_characters(interaction, guild_id):
+                return []
 
             # Search all characters across all users
             char_names = await db.search_all_character_names(current, limit=25)
@@ -313,14 +291,10 @@ def setup_character_commands(bot, db, guild_id):
     @app_commands.checks.cooldown(2, 60.0, key=lambda i: i.user.id)
     async def xp_retire(interaction: discord.Interaction, character_name: str):
         # Check if user has permission to retire characters (admin or character creation role)
-        has_permission = interaction.user.guild_permissions.administrator
-        if not has_permission:
-            allowed_role_ids = await db.get_character_creation_roles(guild_id)
-            if allowed_role_ids:
-                user_role_ids = [role.id for role in interaction.user.roles]
-                has_permission = any(role_id in allowed_role_ids for role_id in user_role_ids)
-            else:
-                has_permission = False
+        # Unlike creation, retiring is denied when no roles are configured
+        has_permission = await bot.permissions.can_manage_characters(
+            interaction, guild_id, allow_if_unconfigured=False
+        )
 
         if not has_permission:
             await interaction.response.send_message(
@@ -339,7 +313,7 @@ def setup_character_commands(bot, db, guild_id):
         char_name = char_data['name']
 
         # Retire the character
-        retired = await db.retire_character(user_id, char_name)
+        retired = await db.retire_character_by_id(char_data['id'])
         if not retired:
             await interaction.response.send_message("❌ Character not found or already retired.", ephemeral=True)
             return
@@ -419,9 +393,9 @@ def setup_character_commands(bot, db, guild_id):
 
         # Update character
         try:
-            success = await db.update_character(
-                user_id,
-                matched_name,
+            character_id = next(c['id'] for c in chars if c['name'] == matched_name)
+            success = await db.update_character_by_id(
+                character_id,
                 new_name=new_name,
                 image_url=processed_image_url,
                 character_sheet_url=processed_sheet_url
@@ -9,6 +9,7 @@ from datetime import date, datetime
 from typing import Optional, List
 from utils.xp import get_level_and_progress
 from utils.quest_xp import calculate_quest_xp
+from utils.quest_snapshot import build_quest_snapshot
 from ui.quest_view import QuestEndConfirmView, QuestDeleteConfirmView
 from ui.dm_name_modal import DMNameModal
 
@@ -30,20 +31,7 @@ def setup_quest_commands(bot, db, guild_id):
 
     async def has_dm_permission(interaction: discord.Interaction) -> bool:
         """Check if user has DM permissions (admin or character creation role)"""
-        # Admins always have permission
-        if interaction.user.guild_permissions.administrator:
-            return True
-
-        # Check if user has any of the DM roles (using character creation roles)
-        allowed_role_ids = await db.get_character_creation_roles(guild_id)
-
-        # If no roles configured, allow everyone
-        if not allowed_role_ids:
-            return True
-
-        # Check if user has any allowed role
-        user_role_ids = [role.id for role in interaction.user.roles]
-        return any(role_id in allowed_role_ids for role_id in user_role_ids)
+        return await bot.permissions.can_manage_characters(interaction, guild_id)
 
     async def active_quest_autocomplete(interaction: discord.Interaction, current: str):
         """Autocomplete for active quest names"""
@@ -89,9 +77,8 @@ def setup_quest_commands(bot, db, guild_id):
     async def user_characters_autocomplete(interaction: discord.Interaction, current: str):
         """Autocomplete for user's own character names"""
         try:
-            user_id = interaction.user.id
-            await db.ensure_user(user_id)
-            characters = await db.list_characters(user_id)
+            # Cached narrow list - typing costs at most one small query per user per TTL
+            characters = await db.get_character_summaries(interaction.user.id)
 
             # Filter by current input
             filtered = [c for c in characters if current.lower() in c['name'].lower()]
@@ -496,8 +483,8 @@ def setup_quest_commands(bot, db, guild_id):
             )
             return
 
-        # Find the quest
-        quest = await db.get_quest_by_name(guild_id, quest_name)
+        # Find the quest with its participants and monsters (one query)
+        quest = await db.get_quest_bundle(guild_id=guild_id, name=quest_name)
         if not quest:
             await interaction.response.send_message(
                 f"Quest '{quest_name}' not found or not active.",
@@ -525,9 +512,9 @@ def setup_quest_commands(bot, db, guild_id):
             )
             return
 
-        # Get preview of quest details
-        participants = await db.get_quest_participants(quest['id'])
-        monsters = await db.get_quest_monsters(quest['id'])
+        # Preview of quest details
+        participants = quest['participants']
+        monsters = quest['monsters']
 
         # Build confirmation message
         confirm_msg = f"⚠️ **Confirm Quest Completion**\n\n"
@@ -539,6 +526,9 @@ def setup_quest_commands(bot, db, guild_id):
         if not monsters:
             confirm_msg += f"⚠️ **Warning:** No monsters have been added yet. You can still end the quest, but there will be no XP calculation.\n\n"
 
+        if monsters and participants:
+            confirm_msg += f"Choose **End Quest & Award XP** to also grant every participant their XP per PC.\n\n"
+
         confirm_msg += f"**Once completed, this quest will be locked and no further changes can be made.**\n"
         confirm_msg += f"Are you sure you want to end this quest?"
 
@@ -570,8 +560,8 @@ def setup_quest_commands(bot, db, guild_id):
             )
             return
 
-        # Find the quest
-        quest = await db.get_quest_by_name(guild_id, quest_name)
+        # Find the quest with its participants and monsters (one query)
+        quest = await db.get_quest_bundle(guild_id=guild_id, name=quest_name)
         if not quest:
             await interaction.response.send_message(
                 f"Active quest '{quest_name}' not found.",
@@ -588,9 +578,9 @@ def setup_quest_commands(bot, db, guild_id):
             )
             return
 
-        # Get quest details for confirmation
-        participants = await db.get_quest_participants(quest['id'])
-        monsters = await db.get_quest_monsters(quest['id'])
+        # Quest details for confirmation
+        participants = quest['participants']
+        monsters = quest['monsters']
 
         # Build confirmation message
         confirm_msg = f"⚠️ **Confirm Quest Deletion**\n\n"
@@ -713,8 +703,8 @@ def setup_quest_commands(bot, db, guild_id):
     @app_commands.autocomplete(quest_name=active_quest_autocomplete)
     async def quest_info(interaction: discord.Interaction, quest_name: str):
         """Display detailed information about an active quest"""
-        # Find the quest (active only)
-        quest = await db.get_quest_by_name(guild_id, quest_name)
+        # Find the quest (active only) with its details in one query
+        quest = await db.get_quest_bundle(guild_id=guild_id, name=quest_name)
         if not quest:
             await interaction.response.send_message(
                 f"Active quest '{quest_name}' not found.",
@@ -722,10 +712,9 @@ def setup_quest_commands(bot, db, guild_id):
             )
             return
 
-        # Get quest details
-        participants = await db.get_quest_participants(quest['id'])
-        dms = await db.get_quest_dms(quest['id'])
-        monsters = await db.get_quest_monsters(quest['id'])
+        participants = quest['participants']
+        dms = quest['dms']
+        monsters = quest['monsters']
 
         # Build embed
         embed = discord.Embed(
@@ -794,7 +783,9 @@ def setup_quest_commands(bot, db, guild_id):
     @bot.tree.command(name="quest_list", description="List all active quests")
     async def quest_list(interaction: discord.Interaction):
         """List all active quests in the server"""
-        quests = await db.get_active_quests(guild_id)
+        # Counters live on the quests row; DM names come back in the same query.
+        # One row past the embed's 25 fields tells us the list was cut short
+        quests = await db.get_quests_with_summary(guild_id, 'active', limit=26)
 
         if not quests:
             await interaction.response.send_message(
@@ -809,14 +800,14 @@ def setup_quest_commands(bot, db, guild_id):
         )
 
         for quest in quests[:25]:  # Limit to 25 for embed field limits
-            # Get participant count
-            participants = await db.get_quest_participants(quest['id'])
-            pc_count = len(participants)
-
             value = f"**Type:** {quest['quest_type']}\n"
             value += f"**Level Bracket:** {quest['level_bracket']}\n"
             value += f"**Started:** {quest['start_date']}\n"
-            value += f"**Participants:** {pc_count}"
+            if quest['dm_names']:
+                value += f"**DMs:** {', '.join(quest['dm_names'])}\n"
+            value += f"**Participants:** {quest['participant_count']}"
+            if quest['monster_count']:
+                value += f" | **Monster XP:** {quest['total_monster_xp']:,}"
 
             embed.add_field(
                 name=quest['name'],
@@ -824,12 +815,17 @@ def setup_quest_commands(bot, db, guild_id):
                 inline=False
             )
 
+        if len(quests) > 25:
+            embed.set_footer(text="Showing the 25 most recently started quests")
+
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @bot.tree.command(name="quest_list_completed", description="List all completed quests")
     async def quest_list_completed(interaction: discord.Interaction):
         """List all completed quests in the server"""
-        quests = await db.get_completed_quests(guild_id)
+        # Counters live on the quests row; DM names come back in the same query.
+        # One row past the embed's 25 fields tells us the list was cut short
+        quests = await db.get_quests_with_summary(guild_id, 'completed', limit=26)
 
         if not quests:
             await interaction.response.send_message(
@@ -844,15 +840,15 @@ def setup_quest_commands(bot, db, guild_id):
         )
 
         for quest in quests[:25]:  # Limit to 25 for embed field limits
-            # Get participant count
-            participants = await db.get_quest_participants(quest['id'])
-            pc_count = len(participants)
-
             value = f"**Type:** {quest['quest_type']}\n"
             value += f"**Level Bracket:** {quest['level_bracket']}\n"
             value += f"**Started:** {quest['start_date']}\n"
             value += f"**Ended:** {quest['end_date']}\n"
-            value += f"**Participants:** {pc_count}"
+            if quest['dm_names']:
+                value += f"**DMs:** {', '.join(quest['dm_names'])}\n"
+            value += f"**Participants:** {quest['participant_count']}"
+            if quest['monster_count']:
+                value += f" | **Monster XP:** {quest['total_monster_xp']:,}"
 
             embed.add_field(
                 name=quest['name'],
@@ -860,6 +856,9 @@ def setup_quest_commands(bot, db, guild_id):
                 inline=False
             )
 
+        if len(quests) > 25:
+            embed.set_footer(text="Showing the 25 most recently ended quests")
+
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @bot.tree.command(name="quest_info_completed", description="View details of a completed quest")
@@ -867,8 +866,8 @@ def setup_quest_commands(bot, db, guild_id):
     @app_commands.autocomplete(quest_name=completed_quest_autocomplete)
     async def quest_info_completed(interaction: discord.Interaction, quest_name: str):
         """Display detailed information about a completed quest"""
-        # Find the quest (completed only)
-        quest = await db.get_completed_quest_by_name(guild_id, quest_name)
+        # Find the quest (completed only) with its frozen snapshot
+        quest = await db.get_completed_quest_snapshot(guild_id, quest_name)
         if not quest:
             await interaction.response.send_message(
                 f"Completed quest '{quest_name}' not found.",
@@ -876,10 +875,13 @@ def setup_quest_commands(bot, db, guild_id):
             )
             return
 
-        # Get quest details
-        participants = await db.get_quest_participants(quest['id'])
-        dms = await db.get_quest_dms(quest['id'])
-        monsters = await db.get_quest_monsters(quest['id'])
+        snapshot = quest['snapshot']
+        if snapshot is None:
+            # Completed before snapshots existed and not backfilled yet
+            snapshot = build_quest_snapshot(await db.get_quest_bundle(quest['id']))
+        participants = snapshot['participants']
+        dms = snapshot['dms']
+        monsters = snapshot['monsters']
 
         # Build embed
         embed = discord.Embed(
@@ -907,13 +909,10 @@ def setup_quest_commands(bot, db, guild_id):
                 pc_list.append(f"{p['character_name']} (Lvl {p['starting_level']})")
             embed.add_field(name=f"Participants ({len(participants)})", value="\n".join(pc_list), inline=True)
 
-        # Monsters and XP Calculation
+        # Monsters and XP (calculated when the quest was completed)
         if monsters:
-            # Calculate XP
-            quest_xp_data = calculate_quest_xp(monsters)
-
             monster_list = []
-            for m in quest_xp_data['breakdown']:
+            for m in monsters:
                 if 'error' in m:
                     name_part = f"{m['monster_name']} - " if m['monster_name'] else ""
                     monster_list.append(f"❌ {m['count']}x {name_part}CR {m['cr']}")
@@ -929,11 +928,10 @@ def setup_quest_commands(bot, db, guild_id):
 
             # XP Summary
             if participants:
-                xp_per_pc = quest_xp_data['total_xp'] // len(participants)
-                xp_summary = f"**Total XP:** {quest_xp_data['total_xp']:,}\n"
-                xp_summary += f"**Per PC:** {xp_per_pc:,} XP"
+                xp_summary = f"**Total XP:** {snapshot['total_xp']:,}\n"
+                xp_summary += f"**Per PC:** {snapshot['xp_per_pc']:,} XP"
             else:
-                xp_summary = f"**Total XP:** {quest_xp_data['total_xp']:,}"
+                xp_summary = f"**Total XP:** {snapshot['total_xp']:,}"
 
             embed.add_field(name="XP Calculation", value=xp_summary, inline=False)
 
@@ -108,7 +108,7 @@ def has_required_role(member_data, db_sync):
         dm_role_ids = run_async(db_sync.get_character_creation_roles(int(GUILD_ID)))
 
         # Check if user has any DM role
-        if any(role_id in dm_role_ids for role_id in [int(r) for r in user_roles]):
+        if not dm_role_ids.isdisjoint(int(r) for r in user_roles):
             return True
     except:
         pass
@@ -3,14 +3,21 @@ Database layer for XP Bot Web Dashboard
 Handles async database queries for quest visualization
 """
 import os
+import time
 import asyncpg
-from typing import List, Dict, Optional
+from typing import List, Dict, FrozenSet, Optional, Tuple
 from datetime import datetime
+from utils.json_rows import decode_json_rows
+
+# Seconds to reuse a guild's role list (role changes are made in the bot, a separate process)
+ROLE_CACHE_TTL = 60
 
 
 class Database:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        # guild_id -> (expires_at, role IDs)
+        self._role_cache: Dict[int, Tuple[float, FrozenSet[int]]] = {}
 
     async def connect(self):
         """Initialize database connection pool"""
@@ -30,6 +37,21 @@ class Database:
         if self.pool:
             await self.pool.close()
 
+    async def get_character_creation_roles(self, guild_id: int) -> FrozenSet[int]:
+        """Get role IDs allowed to create characters (DM roles), cached for ROLE_CACHE_TTL seconds"""
+        cached = self._role_cache.get(guild_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        async with self.pool.acquire() as conn:
+            roles = await conn.fetchval(
+                "SELECT character_creation_roles FROM config WHERE guild_id = $1",
+                guild_id
+            )
+        role_set = frozenset(roles or ())
+        self._role_cache[guild_id] = (time.monotonic() + ROLE_CACHE_TTL, role_set)
+        return role_set
+
     async def get_quest_stats(self) -> Dict:
         """Get overall quest statistics"""
         async with self.pool.acquire() as conn:
@@ -78,16 +100,15 @@ class Database:
                             limit: int = 100) -> List[Dict]:
         """Get all quests with optional filters"""
         async with self.pool.acquire() as conn:
+            # participant_count, monster_count and total_monster_xp are counters on quests
             query = """
                 SELECT
                     q.*,
-                    COUNT(DISTINCT qp.character_id) as participant_count,
-                    ARRAY_AGG(DISTINCT COALESCE(dmp.preferred_dm_name, qd.username, 'User ' || qd.user_id))
-                        FILTER (WHERE qd.user_id IS NOT NULL) as dm_usernames
+                    (SELECT ARRAY_AGG(DISTINCT COALESCE(dmp.preferred_dm_name, qd.username, 'User ' || qd.user_id))
+                     FROM quest_dms qd
+                     LEFT JOIN dm_profiles dmp ON qd.user_id = dmp.user_id
+                     WHERE qd.quest_id = q.id) as dm_usernames
                 FROM quests q
-                LEFT JOIN quest_participants qp ON q.id = qp.quest_id
-                LEFT JOIN quest_dms qd ON q.id = qd.quest_id
-                LEFT JOIN dm_profiles dmp ON qd.user_id = dmp.user_id
                 WHERE 1=1
             """
             params = []
@@ -104,7 +125,6 @@ class Database:
                 param_idx += 1
 
             query += """
-                GROUP BY q.id
                 ORDER BY q.start_date DESC, q.created_at DESC
                 LIMIT $""" + str(param_idx)
             params.append(limit)
@@ -113,49 +133,46 @@ class Database:
             return [dict(row) for row in rows]
 
     async def get_quest_by_id(self, quest_id: int) -> Optional[Dict]:
-        """Get detailed quest information"""
+        """Get detailed quest information (participants, DMs and monsters in one query)
+        Completed quests read participants and monsters from their frozen snapshot; DMs stay
+        live so DM profile renames show on past quests too"""
         async with self.pool.acquire() as conn:
-            quest = await conn.fetchrow(
-                "SELECT * FROM quests WHERE id = $1",
-                quest_id
-            )
+            quest = await conn.fetchrow("""
+                SELECT q.*,
+                    COALESCE(s.snapshot->'participants', (
+                        SELECT COALESCE(json_agg(p ORDER BY p.joined_at), '[]')
+                        FROM (
+                            SELECT qp.*, c.name as character_name, c.user_id
+                            FROM quest_participants qp
+                            JOIN characters c ON qp.character_id = c.id
+                            WHERE qp.quest_id = q.id
+                        ) p)::jsonb) AS participants,
+                    -- DMs with current profile names
+                    (SELECT COALESCE(json_agg(d ORDER BY d.is_primary DESC, d.joined_at), '[]')
+                     FROM (
+                        SELECT
+                            qd.*,
+                            qd.user_id as dm_user_id,
+                            COALESCE(dmp.preferred_dm_name, qd.username, 'User ' || qd.user_id) as username
+                        FROM quest_dms qd
+                        LEFT JOIN dm_profiles dmp ON qd.user_id = dmp.user_id
+                        WHERE qd.quest_id = q.id
+                     ) d) AS dms,
+                    COALESCE(s.snapshot->'monsters', (
+                        SELECT COALESCE(json_agg(qm ORDER BY qm.added_at), '[]')
+                        FROM quest_monsters qm
+                        WHERE qm.quest_id = q.id)::jsonb) AS monsters
+                FROM quests q
+                LEFT JOIN quest_snapshots s ON s.quest_id = q.id
+                WHERE q.id = $1
+            """, quest_id)
 
             if not quest:
                 return None
 
             quest_dict = dict(quest)
-
-            # Get participants
-            participants = await conn.fetch("""
-                SELECT qp.*, c.name as character_name, c.user_id
-                FROM quest_participants qp
-                JOIN characters c ON qp.character_id = c.id
-                WHERE qp.quest_id = $1
-                ORDER BY qp.joined_at
-            """, quest_id)
-            quest_dict['participants'] = [dict(p) for p in participants]
-
-            # Get DMs with current profile names
-            dms = await conn.fetch("""
-                SELECT
-                    qd.*,
-                    qd.user_id as dm_user_id,
-                    COALESCE(dmp.preferred_dm_name, qd.username, 'User ' || qd.user_id) as username
-                FROM quest_dms qd
-                LEFT JOIN dm_profiles dmp ON qd.user_id = dmp.user_id
-                WHERE qd.quest_id = $1
-                ORDER BY qd.is_primary DESC, qd.joined_at
-            """, quest_id)
-            quest_dict['dms'] = [dict(d) for d in dms]
-
-            # Get monsters
-            monsters = await conn.fetch("""
-                SELECT * FROM quest_monsters
-                WHERE quest_id = $1
-                ORDER BY added_at
-            """, quest_id)
-            quest_dict['monsters'] = [dict(m) for m in monsters]
-
+            for key in ('participants', 'dms', 'monsters'):
+                quest_dict[key] = decode_json_rows(quest_dict[key])
             return quest_dict
 
     async def get_level_brackets(self) -> List[str]:
@@ -2,10 +2,12 @@
 Database layer for XP Bot using asyncpg
 """
 import os
+import json
+import asyncio
 import logging
 import asyncpg
 from datetime import date
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, FrozenSet, List, Tuple
 from utils.exceptions import (
     DatabaseConnectionError,
     DatabaseTimeoutError,
@@ -14,16 +16,51 @@ from utils.exceptions import (
     DuplicateCharacterError
 )
 from utils.retry import retry_on_db_error
+from utils.cache import TTLCache
+from utils.char_buffer import CharBufferAccumulator
+from utils.name_index import CharacterNameIndex
+from utils.quest_xp import CR_TO_XP
+from utils.quest_snapshot import build_quest_snapshot
+from utils.json_rows import decode_json_rows
+from utils.xp import get_level_and_progress, get_local_date
+from utils.migrations import migrate
 
 logger = logging.getLogger('xp-bot.database')
 
+# Per-user profile cache bounds (entries, seconds). Only this process's writes invalidate
+# entries; changes made elsewhere (the dashboard, manual SQL) show up once the TTL expires
+USER_CACHE_SIZE = 10000
+USER_CACHE_TTL = 600
+# Per-user (id, name, xp, retired) lists for personal autocompletes (entries, seconds)
+CHARACTER_LIST_CACHE_SIZE = 5000
+CHARACTER_LIST_CACHE_TTL = 300
+# Quest list ordering per status
+QUEST_SORT_COLUMNS = {'active': 'start_date', 'completed': 'end_date'}
+
 
 class Database:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        self._connected = asyncio.Event()
+        self._schema_initialized = False
+        # Set by initialize_schema when pg_trgm is installed; enables similarity ranking in name search
+        self._trigram_search = False
+        # guild_id -> (config dict, RP settings, character creation role set); write-through invalidated, no expiry
+        self._config_cache = TTLCache()
+        # user_id -> users row (existence, timezone, last_xp_reset, active_character_id)
+        self._user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+        # user_id -> list of character summaries; invalidated by every character write
+        self._character_list_cache = TTLCache(maxsize=CHARACTER_LIST_CACHE_SIZE, ttl=CHARACTER_LIST_CACHE_TTL)
+        # Write-behind RP buffer state, flushed by the background task in handlers/tasks.py
+        self.char_buffers = CharBufferAccumulator(self)
+        # Every character's name/owner/retired flag, for autocomplete and exact-name lookups
+        self.character_names = CharacterNameIndex()
 
     async def connect(self):
-        """Initialize database connection pool"""
+        """Initialize database connection pool (no-op if already connected)"""
+        if self.pool is not None:
+            return
+
         database_url = os.getenv('DATABASE_URL')
         if not database_url:
             logger.error("DATABASE_URL environment variable not set")
@@ -38,6 +75,7 @@ class Database:
                 command_timeout=60
             )
             logger.info("Database connected successfully")
+            self._connected.set()
         except asyncpg.InvalidCatalogNameError as e:
             logger.error(f"Database does not exist: {e}")
             raise DatabaseConnectionError(f"Database does not exist: {e}") from e
@@ -51,6 +89,10 @@ class Database:
             logger.error(f"Failed to connect to database: {e}")
             raise DatabaseConnectionError(f"Database connection failed: {e}") from e
 
+    async def wait_until_connected(self):
+        """Block until connect() has created the pool (for background tasks)"""
+        await self._connected.wait()
+
     async def close(self):
         """Close database connection pool"""
         if self.pool:
@@ -59,20 +101,21 @@ class Database:
 
     @retry_on_db_error(max_attempts=3, delay=1.0)
     async def initialize_schema(self):
-        """Create tables if they don't exist"""
+        """Apply pending migrations from migrations/ (runs once per process)"""
+        if self._schema_initialized:
+            return
         try:
-            schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-            logger.debug(f"Loading schema from {schema_path}")
-
-            with open(schema_path, 'r') as f:
-                schema_sql = f.read()
-
-            async with self.pool.acquire() as conn:
-                await conn.execute(schema_sql)
-            logger.info("Database schema initialized")
-        except FileNotFoundError:
-            logger.error(f"Schema file not found: {schema_path}")
-            raise DatabaseError(f"Schema file not found") from None
+            applied, extensions = await migrate(self.pool)
+            # Migration 0015 installs pg_trgm when it can
+            self._trigram_search = 'pg_trgm' in extensions
+            self._schema_initialized = True
+            if applied:
+                logger.info(f"Database schema initialized ({applied} migrations applied)")
+            else:
+                logger.info("Database schema is up to date")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load migrations: {e}")
+            raise DatabaseError(f"Failed to load migrations") from e
         except asyncpg.PostgresError as e:
             logger.error(f"Failed to initialize schema: {e}")
             raise DatabaseError(f"Failed to initialize database schema") from e
@@ -83,7 +126,29 @@ class Database:
     # ==================== CONFIG METHODS ====================
 
     async def get_config(self, guild_id: int) -> Dict:
-        """Get guild configuration, create if doesn't exist"""
+        """Get guild configuration, create if doesn't exist (served from cache when possible)"""
+        cached = self._config_cache.get(guild_id)
+        if cached is None:
+            cached = await self._load_config(guild_id)
+        return dict(cached[0])
+
+    async def get_rp_settings(self, guild_id: int) -> Dict:
+        """Get the RP tracking settings used on the message hot path
+        Returns dict with rp_channels (frozenset), char_per_rp and daily_rp_cap"""
+        cached = self._config_cache.get(guild_id)
+        if cached is None:
+            cached = await self._load_config(guild_id)
+        return cached[1]
+
+    async def get_character_creation_role_set(self, guild_id: int) -> FrozenSet[int]:
+        """Role IDs allowed to create characters (and act as DM), for permission checks"""
+        cached = self._config_cache.get(guild_id)
+        if cached is None:
+            cached = await self._load_config(guild_id)
+        return cached[2]
+
+    async def _load_config(self, guild_id: int) -> Tuple[Dict, Dict, FrozenSet[int]]:
+        """Fetch (or create) guild config from the database and cache it"""
         async with self.pool.acquire() as conn:
             config = await conn.fetchrow(
                 "SELECT * FROM config WHERE guild_id = $1",
@@ -99,7 +164,31 @@ class Database:
                     RETURNING *
                 """, guild_id)
 
-            return dict(config)
+        config = dict(config)
+        rp_settings = {
+            'rp_channels': frozenset(config.get('rp_channels') or ()),
+            'char_per_rp': config.get('char_per_rp', 240),
+            'daily_rp_cap': config.get('daily_rp_cap', 5)
+        }
+        creation_roles = frozenset(config.get('character_creation_roles') or ())
+        self._config_cache.set(guild_id, (config, rp_settings, creation_roles))
+        return config, rp_settings, creation_roles
+
+    def _invalidate_config(self, guild_id: int):
+        """Drop cached config after a write so the next read reloads it"""
+        self._config_cache.pop(guild_id)
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss counters for the in-process caches"""
+        return {
+            'config': self._config_cache.stats(),
+            'users': self._user_cache.stats(),
+            'character_lists': self._character_list_cache.stats()
+        }
+
+    def pipeline_stats(self) -> Dict[str, Dict]:
+        """Return metrics for the RP message pipeline"""
+        return {'char_buffer': self.char_buffers.stats()}
 
     async def update_config(self, guild_id: int, **kwargs):
         """Update guild configuration"""
@@ -119,6 +208,7 @@ class Database:
 
         async with self.pool.acquire() as conn:
             await conn.execute(query, *values)
+        self._invalidate_config(guild_id)
 
     async def add_rp_channel(self, guild_id: int, channel_id: int):
         """Add channel to RP tracking list"""
@@ -129,6 +219,7 @@ class Database:
                     updated_at = NOW()
                 WHERE guild_id = $1 AND NOT ($2 = ANY(rp_channels))
             """, guild_id, channel_id)
+        self._invalidate_config(guild_id)
 
     async def remove_rp_channel(self, guild_id: int, channel_id: int):
         """Remove channel from RP tracking list"""
@@ -139,6 +230,7 @@ class Database:
                     updated_at = NOW()
                 WHERE guild_id = $1
             """, guild_id, channel_id)
+        self._invalidate_config(guild_id)
 
     async def add_survival_channel(self, guild_id: int, channel_id: int):
         """Add channel to survival (prized species) tracking list"""
@@ -149,6 +241,7 @@ class Database:
                     updated_at = NOW()
                 WHERE guild_id = $1 AND NOT ($2 = ANY(survival_channels))
             """, guild_id, channel_id)
+        self._invalidate_config(guild_id)
 
     async def remove_survival_channel(self, guild_id: int, channel_id: int):
         """Remove channel from survival (prized species) tracking list"""
@@ -159,6 +252,7 @@ class Database:
                     updated_at = NOW()
                 WHERE guild_id = $1
             """, guild_id, channel_id)
+        self._invalidate_config(guild_id)
 
     async def add_character_creation_role(self, guild_id: int, role_id: int):
         """Add role to character creation permissions"""
@@ -169,6 +263,7 @@ class Database:
                     updated_at = NOW()
                 WHERE guild_id = $1 AND NOT ($2 = ANY(character_creation_roles))
             """, guild_id, role_id)
+        self._invalidate_config(guild_id)
 
     async def remove_character_creation_role(self, guild_id: int, role_id: int):
         """Remove role from character creation permissions"""
@@ -179,6 +274,7 @@ class Database:
                     updated_at = NOW()
                 WHERE guild_id = $1
             """, guild_id, role_id)
+        self._invalidate_config(guild_id)
 
     async def get_character_creation_roles(self, guild_id: int) -> list:
         """Get list of role IDs allowed to create characters"""
@@ -203,34 +299,76 @@ class Database:
             )
             return result
 
+    async def get_command_sync_hash(self, scope: str) -> Optional[str]:
+        """Get the payload hash last synced for a command scope"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                "SELECT payload_hash FROM command_sync_state WHERE scope = $1",
+                scope
+            )
+
+    async def set_command_sync_hash(self, scope: str, payload_hash: str):
+        """Record the payload hash just synced for a command scope"""
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO command_sync_state (scope, payload_hash)
+                VALUES ($1, $2)
+                ON CONFLICT (scope) DO UPDATE SET payload_hash = $2, synced_at = NOW()
+            """, scope, payload_hash)
+
     # ==================== USER METHODS ====================
 
-    async def ensure_user(self, user_id: int) -> Dict:
-        """Get or create user, returns user data with active character info"""
+    async def _get_user_profile(self, user_id: int) -> Optional[Dict]:
+        """Cached users row, or None if the user doesn't exist (misses aren't cached)"""
+        profile = self._user_cache.get(user_id)
+        if profile is not None:
+            return profile
+
         async with self.pool.acquire() as conn:
             user = await conn.fetchrow(
                 "SELECT * FROM users WHERE user_id = $1",
                 user_id
             )
 
-            if not user:
-                # Create new user
-                user = await conn.fetchrow("""
-                    INSERT INTO users (user_id, timezone, last_xp_reset)
-                    VALUES ($1, 'UTC', CURRENT_DATE)
-                    RETURNING *
-                """, user_id)
+        if not user:
+            return None
+        profile = dict(user)
+        self._user_cache.set(user_id, profile)
+        return profile
+
+    def _invalidate_user(self, user_id: int):
+        """Drop cached per-user state after a write that touches it"""
+        self._user_cache.pop(user_id)
+        self._character_list_cache.pop(user_id)
+        self.char_buffers.invalidate(user_id)
+
+    def peek_user_timezone(self, user_id: int) -> Optional[str]:
+        """Cached timezone without touching the database (None if not cached)"""
+        profile = self._user_cache.peek(user_id)
+        return (profile['timezone'] or 'UTC') if profile is not None else None
 
+    async def ensure_user(self, user_id: int) -> Dict:
+        """Get or create user, returns user data with active character info"""
+        user = await self._get_user_profile(user_id)
+        if user is not None:
             return dict(user)
 
+        async with self.pool.acquire() as conn:
+            # Create new user (another caller may have inserted it meanwhile)
+            user = await conn.fetchrow("""
+                INSERT INTO users (user_id, timezone, last_xp_reset)
+                VALUES ($1, 'UTC', CURRENT_DATE)
+                ON CONFLICT (user_id) DO UPDATE SET user_id = EXCLUDED.user_id
+                RETURNING *
+            """, user_id)
+
+        self._user_cache.set(user_id, dict(user))
+        return dict(user)
+
     async def get_user_timezone(self, user_id: int) -> str:
         """Get user's timezone"""
-        async with self.pool.acquire() as conn:
-            result = await conn.fetchval(
-                "SELECT timezone FROM users WHERE user_id = $1",
-                user_id
-            )
-            return result or 'UTC'
+        user = await self._get_user_profile(user_id)
+        return (user['timezone'] if user else None) or 'UTC'
 
     async def set_user_timezone(self, user_id: int, timezone: str):
         """Set user's timezone"""
@@ -241,14 +379,12 @@ class Database:
                 SET timezone = $2, updated_at = NOW()
                 WHERE user_id = $1
             """, user_id, timezone)
+        self._invalidate_user(user_id)
 
     async def get_last_xp_reset(self, user_id: int) -> Optional[date]:
         """Get user's last XP reset date"""
-        async with self.pool.acquire() as conn:
-            return await conn.fetchval(
-                "SELECT last_xp_reset FROM users WHERE user_id = $1",
-                user_id
-            )
+        user = await self._get_user_profile(user_id)
+        return user['last_xp_reset'] if user else None
 
     async def update_last_xp_reset(self, user_id: int, reset_date: date):
         """Update user's last XP reset date"""
@@ -258,6 +394,7 @@ class Database:
                 SET last_xp_reset = $2, updated_at = NOW()
                 WHERE user_id = $1
             """, user_id, reset_date)
+        self._invalidate_user(user_id)
 
     # ==================== CHARACTER METHODS ====================
 
@@ -280,6 +417,8 @@ class Database:
                     SET active_character_id = $2, updated_at = NOW()
                     WHERE user_id = $1 AND active_character_id IS NULL
                 """, user_id, char_id)
+                self._invalidate_user(user_id)
+                self.character_names.upsert(char_id, user_id, name)
 
                 logger.info(f"Created character '{name}' (ID: {char_id}) for user {user_id}")
                 return char_id
@@ -306,65 +445,104 @@ class Database:
             if not char:
                 return False
 
-            # Delete character (CASCADE will handle active_character_id via SET NULL)
-            await conn.execute(
-                "DELETE FROM characters WHERE id = $1",
-                char['id']
-            )
+            async with conn.transaction():
+                await self._remove_quest_participations(conn, [char['id']])
+                # Delete character (CASCADE will handle active_character_id via SET NULL)
+                await conn.execute(
+                    "DELETE FROM characters WHERE id = $1",
+                    char['id']
+                )
 
+            self._invalidate_user(user_id)
+            self.character_names.remove(char['id'])
             return True
 
-    async def retire_character(self, user_id: int, name: str) -> bool:
+    async def _remove_quest_participations(self, conn: asyncpg.Connection, character_ids: List[int]):
+        """Drop characters from their quests ahead of a delete, keeping participant_count current
+        (the cascade from characters would remove the rows without touching the counters)"""
+        await conn.execute("""
+            WITH removed AS (
+                DELETE FROM quest_participants
+                WHERE character_id = ANY($1::int[])
+                RETURNING quest_id
+            )
+            UPDATE quests q SET participant_count = q.participant_count - r.removed
+            FROM (SELECT quest_id, COUNT(*) AS removed FROM removed GROUP BY quest_id) r
+            WHERE q.id = r.quest_id
+        """, character_ids)
+
+    async def _get_character_id(self, user_id: int, name: str, retired: Optional[bool] = False) -> Optional[int]:
+        """Resolve a character name to its ID (retired=None matches either state)"""
+        async with self.pool.acquire() as conn:
+            if retired is None:
+                return await conn.fetchval(
+                    "SELECT id FROM characters WHERE user_id = $1 AND name = $2",
+                    user_id, name
+                )
+            return await conn.fetchval(
+                "SELECT id FROM characters WHERE user_id = $1 AND name = $2 AND retired = $3",
+                user_id, name, retired
+            )
+
+    async def retire_character_by_id(self, character_id: int) -> bool:
         """Retire a character (soft delete), returns True if retired
         Retired characters are hidden but can be restored"""
         async with self.pool.acquire() as conn:
-            # Get character ID
-            char = await conn.fetchrow(
-                "SELECT id FROM characters WHERE user_id = $1 AND name = $2 AND retired = FALSE",
-                user_id, name
-            )
+            async with conn.transaction():
+                # Mark as retired
+                char = await conn.fetchrow("""
+                    UPDATE characters
+                    SET retired = TRUE, updated_at = NOW()
+                    WHERE id = $1 AND retired = FALSE
+                    RETURNING user_id, name
+                """, character_id)
 
-            if not char:
-                return False
+                if not char:
+                    return False
 
-            # Mark as retired and clear if it's the active character
-            await conn.execute("""
-                UPDATE characters
-                SET retired = TRUE, updated_at = NOW()
-                WHERE id = $1
-            """, char['id'])
+                # Clear active_character_id if this was the active character
+                await conn.execute("""
+                    UPDATE users
+                    SET active_character_id = NULL, updated_at = NOW()
+                    WHERE user_id = $1 AND active_character_id = $2
+                """, char['user_id'], character_id)
 
-            # Clear active_character_id if this was the active character
-            await conn.execute("""
-                UPDATE users
-                SET active_character_id = NULL, updated_at = NOW()
-                WHERE user_id = $1 AND active_character_id = $2
-            """, user_id, char['id'])
+        self._invalidate_user(char['user_id'])
+        self.character_names.set_retired(character_id, True)
+        logger.info(f"Retired character '{char['name']}' (ID: {character_id}) for user {char['user_id']}")
+        return True
 
-            logger.info(f"Retired character '{name}' (ID: {char['id']}) for user {user_id}")
-            return True
+    async def retire_character(self, user_id: int, name: str) -> bool:
+        """Retire a character by name (see retire_character_by_id)"""
+        character_id = await self._get_character_id(user_id, name)
+        if character_id is None:
+            return False
+        return await self.retire_character_by_id(character_id)
 
-    async def restore_character(self, user_id: int, name: str) -> bool:
+    async def restore_character_by_id(self, character_id: int) -> bool:
         """Restore a retired character, returns True if restored"""
         async with self.pool.acquire() as conn:
-            # Get retired character
-            char = await conn.fetchrow(
-                "SELECT id FROM characters WHERE user_id = $1 AND name = $2 AND retired = TRUE",
-                user_id, name
-            )
-
-            if not char:
-                return False
-
-            # Unmark as retired
-            await conn.execute("""
+            char = await conn.fetchrow("""
                 UPDATE characters
                 SET retired = FALSE, updated_at = NOW()
-                WHERE id = $1
-            """, char['id'])
+                WHERE id = $1 AND retired = TRUE
+                RETURNING user_id, name
+            """, character_id)
 
-            logger.info(f"Restored character '{name}' (ID: {char['id']}) for user {user_id}")
-            return True
+        if not char:
+            return False
+
+        self.character_names.set_retired(character_id, False)
+        self._character_list_cache.pop(char['user_id'])
+        logger.info(f"Restored character '{char['name']}' (ID: {character_id}) for user {char['user_id']}")
+        return True
+
+    async def restore_character(self, user_id: int, name: str) -> bool:
+        """Restore a retired character by name (see restore_character_by_id)"""
+        character_id = await self._get_character_id(user_id, name, retired=True)
+        if character_id is None:
+            return False
+        return await self.restore_character_by_id(character_id)
 
     async def purge_user(self, user_id: int) -> bool:
         """Permanently delete a user and all their characters (for GDPR compliance)
@@ -379,15 +557,38 @@ class Database:
             if not user:
                 return False
 
-            # Delete user (CASCADE will delete all characters and related data)
-            await conn.execute(
-                "DELETE FROM users WHERE user_id = $1",
-                user_id
-            )
+            async with conn.transaction():
+                character_ids = [r['id'] for r in await conn.fetch(
+                    "SELECT id FROM characters WHERE user_id = $1",
+                    user_id
+                )]
+                await self._remove_quest_participations(conn, character_ids)
+                # Delete user (CASCADE will delete all characters and related data)
+                await conn.execute(
+                    "DELETE FROM users WHERE user_id = $1",
+                    user_id
+                )
+            self._invalidate_user(user_id)
+            self.character_names.remove_user(user_id)
 
             logger.warning(f"PURGED user {user_id} and all their characters from database")
             return True
 
+    async def get_character_by_id(self, character_id: int, include_retired: bool = False) -> Optional[Dict]:
+        """Get character by ID (excludes retired by default)"""
+        async with self.pool.acquire() as conn:
+            if include_retired:
+                char = await conn.fetchrow(
+                    "SELECT * FROM characters WHERE id = $1",
+                    character_id
+                )
+            else:
+                char = await conn.fetchrow(
+                    "SELECT * FROM characters WHERE id = $1 AND retired = FALSE",
+                    character_id
+                )
+            return dict(char) if char else None
+
     async def get_character(self, user_id: int, name: str, include_retired: bool = False) -> Optional[Dict]:
         """Get character by name (excludes retired by default)"""
         async with self.pool.acquire() as conn:
@@ -413,26 +614,27 @@ class Database:
             """, user_id)
             return dict(char) if char else None
 
-    async def set_active_character(self, user_id: int, name: str) -> bool:
-        """Set user's active character by name (cannot set retired characters as active)"""
+    async def set_active_character_by_id(self, user_id: int, character_id: int) -> bool:
+        """Set user's active character (must belong to the user and not be retired)"""
         async with self.pool.acquire() as conn:
-            # Get character ID (only non-retired)
-            char = await conn.fetchrow(
-                "SELECT id FROM characters WHERE user_id = $1 AND name = $2 AND retired = FALSE",
-                user_id, name
-            )
-
-            if not char:
-                return False
-
-            # Update user's active character
-            await conn.execute("""
+            result = await conn.execute("""
                 UPDATE users
                 SET active_character_id = $2, updated_at = NOW()
                 WHERE user_id = $1
-            """, user_id, char['id'])
+                AND EXISTS (
+                    SELECT 1 FROM characters
+                    WHERE id = $2 AND user_id = $1 AND retired = FALSE
+                )
+            """, user_id, character_id)
+        self._invalidate_user(user_id)
+        return result != "UPDATE 0"
 
-            return True
+    async def set_active_character(self, user_id: int, name: str) -> bool:
+        """Set user's active character by name (cannot set retired characters as active)"""
+        character_id = await self._get_character_id(user_id, name)
+        if character_id is None:
+            return False
+        return await self.set_active_character_by_id(user_id, character_id)
 
     async def list_characters(self, user_id: int, include_retired: bool = False) -> List[Dict]:
         """List all characters for a user (excludes retired by default)"""
@@ -449,6 +651,24 @@ class Database:
                 )
             return [dict(char) for char in chars]
 
+    async def get_character_summaries(self, user_id: int, include_retired: bool = False) -> List[Dict]:
+        """Cached id, name, xp and retired flag of each of a user's characters, oldest first
+        For autocompletes and pickers; use list_characters() when full rows are needed.
+        The returned dicts are shared with the cache - don't modify them"""
+        summaries = self._character_list_cache.get(user_id)
+        if summaries is None:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch(
+                    "SELECT id, name, xp, retired FROM characters WHERE user_id = $1 ORDER BY created_at",
+                    user_id
+                )
+            summaries = [dict(row) for row in rows]
+            self._character_list_cache.set(user_id, summaries)
+
+        if include_retired:
+            return summaries
+        return [summary for summary in summaries if not summary['retired']]
+
     async def get_all_character_names(self, user_id: int, include_retired: bool = False) -> List[str]:
         """Get list of character names for a user (excludes retired by default)"""
         async with self.pool.acquire() as conn:
@@ -464,10 +684,32 @@ class Database:
                 )
             return [row['name'] for row in names]
 
+    async def load_character_names(self) -> int:
+        """(Re)build the in-memory character name index, returns the number of characters"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT id, user_id, name, retired FROM characters ORDER BY updated_at"
+            )
+        self.character_names.load(rows)
+        return len(rows)
+
     async def find_character_by_name_any_user(self, name: str, include_retired: bool = False) -> Optional[Tuple[int, Dict]]:
         """Find character by name across all users (for HF tracking)
         Returns (user_id, character_dict) or None
         DEPRECATED: Use find_all_characters_by_name() for collision-safe lookups"""
+        if self.character_names.loaded:
+            # Resolve the name in memory and fetch by primary key
+            for entry in self.character_names.find_exact(name, include_retired):
+                char = await self.get_character_by_id(entry.id, include_retired=True)
+                if char and char['name'] == name and (include_retired or not char['retired']):
+                    return (char['user_id'], char)
+                # Changed by another process since the index was loaded
+                if char:
+                    self.character_names.upsert(char['id'], char['user_id'], char['name'], char['retired'])
+                else:
+                    self.character_names.remove(entry.id)
+
+        # Not indexed (or the index isn't loaded yet): fall back to the name lookup
         async with self.pool.acquire() as conn:
             if include_retired:
                 char = await conn.fetchrow(
@@ -480,6 +722,8 @@ class Database:
                     name
                 )
             if char:
+                if self.character_names.loaded:
+                    self.character_names.upsert(char['id'], char['user_id'], char['name'], char['retired'])
                 return (char['user_id'], dict(char))
             return None
 
@@ -499,110 +743,264 @@ class Database:
                 )
             return [(char['user_id'], dict(char)) for char in chars]
 
+    def _name_rank(self, param: str) -> str:
+        """ORDER BY terms ranking name matches for the search text in `param`
+        Prefix matches first, then trigram similarity (when pg_trgm is installed)"""
+        rank = f"(lower(name) LIKE lower({param}) || '%') DESC"
+        if self._trigram_search:
+            rank += f", similarity(lower(name), lower({param})) DESC"
+        return rank
+
     async def search_all_character_names(self, search: str = "", limit: int = 25, include_retired: bool = False) -> List[str]:
         """Search for character names across all users (for autocomplete, excludes retired by default)
-        Returns list of character names matching search term"""
+        Returns list of character names matching search term, best matches first
+        Answered from the in-memory name index once it is loaded"""
+        if self.character_names.loaded:
+            return self.character_names.search(search, limit, include_retired)
+
+        retired_filter = "" if include_retired else "AND retired = FALSE"
         async with self.pool.acquire() as conn:
-            if include_retired:
-                if search:
-                    chars = await conn.fetch(
-                        "SELECT DISTINCT name FROM characters WHERE LOWER(name) LIKE LOWER($1) ORDER BY name LIMIT $2",
-                        f"%{search}%", limit
-                    )
-                else:
-                    chars = await conn.fetch(
-                        "SELECT DISTINCT name FROM characters ORDER BY updated_at DESC LIMIT $1",
-                        limit
-                    )
+            if search:
+                # lower(name) LIKE '%...%' is served by the trigram GIN indexes
+                chars = await conn.fetch(f"""
+                    SELECT name FROM characters
+                    WHERE lower(name) LIKE '%' || lower($1) || '%' {retired_filter}
+                    GROUP BY name
+                    ORDER BY {self._name_rank('$1')}, name
+                    LIMIT $2
+                """, search, limit)
             else:
-                if search:
-                    chars = await conn.fetch(
-                        "SELECT DISTINCT name FROM characters WHERE LOWER(name) LIKE LOWER($1) AND retired = FALSE ORDER BY name LIMIT $2",
-                        f"%{search}%", limit
-                    )
-                else:
-                    chars = await conn.fetch(
-                        "SELECT DISTINCT name FROM characters WHERE retired = FALSE ORDER BY updated_at DESC LIMIT $1",
-                        limit
-                    )
+                # Most recently updated names: walk the updated_at index and dedupe a bounded
+                # window instead of sorting every character
+                chars = await conn.fetch(f"""
+                    SELECT name FROM (
+                        SELECT name, updated_at FROM characters
+                        WHERE TRUE {retired_filter}
+                        ORDER BY updated_at DESC
+                        LIMIT $1 * 4
+                    ) recent
+                    GROUP BY name
+                    ORDER BY MAX(updated_at) DESC
+                    LIMIT $1
+                """, limit)
             return [row['name'] for row in chars]
 
     @retry_on_db_error(max_attempts=3)
+    async def award_xp_by_id(self, character_id: int, xp_amount: int,
+                             daily_xp_delta: int = 0, char_buffer_delta: int = 0) -> Optional[Dict]:
+        """Award XP to a character and update daily counters in a single atomic UPDATE
+        Daily counters follow the same lazy rule as process_rp_message(): when cap_day isn't the
+        owner's local date they count as zero before the delta is added, and cap_day is stamped.
+        Returns None if the character doesn't exist, otherwise dict with: old_xp, new_xp,
+        old_level, new_level, leveled_up, character (the full updated row)"""
+        try:
+            async with self.pool.acquire() as conn:
+                if daily_xp_delta or char_buffer_delta:
+                    timezone = await conn.fetchval("""
+                        SELECT u.timezone FROM characters c
+                        JOIN users u ON u.user_id = c.user_id
+                        WHERE c.id = $1
+                    """, character_id)
+                    row = await conn.fetchrow("""
+                        UPDATE characters
+                        SET xp = xp + $2,
+                            daily_xp = CASE WHEN cap_day IS NOT DISTINCT FROM $5 THEN COALESCE(daily_xp, 0) ELSE 0 END + $3,
+                            char_buffer = CASE WHEN cap_day IS NOT DISTINCT FROM $5 THEN COALESCE(char_buffer, 0) ELSE 0 END + $4,
+                            cap_day = $5,
+                            updated_at = NOW()
+                        WHERE id = $1
+                        RETURNING xp - $2 AS old_xp, xp AS new_xp, *
+                    """, character_id, xp_amount, daily_xp_delta, char_buffer_delta, get_local_date(timezone or 'UTC'))
+                else:
+                    row = await conn.fetchrow("""
+                        UPDATE characters
+                        SET xp = xp + $2,
+                            updated_at = NOW()
+                        WHERE id = $1
+                        RETURNING xp - $2 AS old_xp, xp AS new_xp, *
+                    """, character_id, xp_amount)
+        except asyncpg.PostgresError as e:
+            logger.error(f"Database error awarding XP to character {character_id}: {e}")
+            raise DatabaseError(f"Failed to award XP") from e
+
+        if not row:
+            return None
+
+        character = dict(row)
+        old_xp = character.pop('old_xp')
+        new_xp = character.pop('new_xp')
+
+        self._character_list_cache.pop(character['user_id'])
+        if daily_xp_delta or char_buffer_delta:
+            self.char_buffers.invalidate(character['user_id'])
+
+        # Calculate levels
+        old_level, _, _ = get_level_and_progress(old_xp)
+        new_level, _, _ = get_level_and_progress(new_xp)
+
+        if xp_amount > 0:
+            logger.debug(f"Awarded {xp_amount} XP to '{character['name']}' (ID: {character_id}) - Level {old_level} -> {new_level}")
+
+        return {
+            'old_xp': old_xp,
+            'new_xp': new_xp,
+            'old_level': old_level,
+            'new_level': new_level,
+            'leveled_up': new_level > old_level,
+            'character': character
+        }
+
     async def award_xp(self, user_id: int, char_name: str, xp_amount: int,
-                       daily_xp_delta: int = 0, char_buffer_delta: int = 0) -> dict:
-        """Award XP to a character and update daily counters
-        Returns dict with: old_xp, new_xp, old_level, new_level, leveled_up"""
+                       daily_xp_delta: int = 0, char_buffer_delta: int = 0) -> Optional[Dict]:
+        """Award XP to a character by name (see award_xp_by_id)"""
+        character_id = await self._get_character_id(user_id, char_name, retired=None)
+        if character_id is None:
+            return None
+        return await self.award_xp_by_id(character_id, xp_amount, daily_xp_delta, char_buffer_delta)
+
+    @retry_on_db_error(max_attempts=3)
+    async def process_rp_message(self, user_id: int, char_count: int, local_date: Optional[date],
+                                 char_per_rp: int, daily_cap: int) -> Optional[Dict]:
+        """Apply one RP message to the user's active character in a single round trip
+        (user upsert, lazy daily cap, buffer math, cap clamp and XP award run in process_rp_message())
+        Pass local_date=None to let the database derive it from the user's timezone.
+        Returns None if the user has no active character, otherwise dict with: character_id,
+        character_name, old_xp, new_xp, xp_gained, char_buffer, daily_xp, image_url,
+        character_sheet_url, local_date, timezone, old_level, new_level, leveled_up"""
         try:
             async with self.pool.acquire() as conn:
-                # Get old XP first
-                old_char = await conn.fetchrow("""
-                    SELECT xp FROM characters
-                    WHERE user_id = $1 AND name = $2
-                """, user_id, char_name)
+                row = await conn.fetchrow(
+                    "SELECT * FROM process_rp_message($1, $2, $3, $4, $5)",
+                    user_id, char_count, local_date, char_per_rp, daily_cap
+                )
+        except asyncpg.PostgresError as e:
+            logger.error(f"Database error processing RP message for user {user_id}: {e}")
+            raise DatabaseError(f"Failed to process RP message") from e
 
-                old_xp = old_char['xp'] if old_char else 0
+        if not row:
+            return None
 
-                # Update XP
-                result = await conn.execute("""
-                    UPDATE characters
-                    SET xp = xp + $3,
-                        daily_xp = daily_xp + $4,
-                        char_buffer = char_buffer + $5,
-                        updated_at = NOW()
-                    WHERE user_id = $1 AND name = $2
-                """, user_id, char_name, xp_amount, daily_xp_delta, char_buffer_delta)
-
-                # Get new XP
-                new_char = await conn.fetchrow("""
-                    SELECT xp FROM characters
-                    WHERE user_id = $1 AND name = $2
-                """, user_id, char_name)
-
-                new_xp = new_char['xp'] if new_char else old_xp
-
-                # Calculate levels
-                from utils.xp import get_level_and_progress
-                old_level, _, _ = get_level_and_progress(old_xp)
-                new_level, _, _ = get_level_and_progress(new_xp)
-
-                leveled_up = new_level > old_level
-
-                if xp_amount > 0:
-                    logger.debug(f"Awarded {xp_amount} XP to '{char_name}' (user {user_id}) - Level {old_level} -> {new_level}")
-
-                return {
-                    'old_xp': old_xp,
-                    'new_xp': new_xp,
-                    'old_level': old_level,
-                    'new_level': new_level,
-                    'leveled_up': leveled_up
-                }
+        return self._rp_result(user_id, row)
+
+    @retry_on_db_error(max_attempts=3)
+    async def process_rp_batch(self, user_ids: List[int], char_counts: List[int], local_dates: List[Optional[date]],
+                               char_per_rp: List[int], daily_caps: List[int]) -> List[Dict]:
+        """Apply a batch of RP updates (one entry per user) in a single statement and transaction
+        Arrays are parallel; returns process_rp_message() results plus user_id, skipping users
+        without an active character"""
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch("""
+                    SELECT m.user_id, r.*
+                    FROM unnest($1::bigint[], $2::int[], $3::date[], $4::int[], $5::int[])
+                        WITH ORDINALITY AS m(user_id, char_count, local_date, char_per_rp, daily_cap, ord)
+                    CROSS JOIN LATERAL process_rp_message(
+                        m.user_id, m.char_count, m.local_date, m.char_per_rp, m.daily_cap
+                    ) AS r
+                    ORDER BY m.ord
+                """, user_ids, char_counts, local_dates, char_per_rp, daily_caps)
         except asyncpg.PostgresError as e:
-            logger.error(f"Database error awarding XP to '{char_name}' for user {user_id}: {e}")
-            raise DatabaseError(f"Failed to award XP") from e
-        except Exception as e:
-            logger.error(f"Unexpected error awarding XP to '{char_name}' for user {user_id}: {e}")
-            raise DatabaseError(f"Failed to award XP") from e
+            logger.error(f"Database error processing RP batch of {len(user_ids)} users: {e}")
+            raise DatabaseError(f"Failed to process RP batch") from e
+
+        return [self._rp_result(row['user_id'], row) for row in rows]
+
+    def _rp_result(self, user_id: int, row) -> Dict:
+        """process_rp_message() row as a dict with level-up detection"""
+        result = dict(row)
+        old_level, _, _ = get_level_and_progress(result['old_xp'])
+        new_level, _, _ = get_level_and_progress(result['new_xp'])
+        result['old_level'] = old_level
+        result['new_level'] = new_level
+        result['leveled_up'] = new_level > old_level
 
-    async def reset_daily_caps(self, user_id: int):
-        """Reset daily XP caps for all user's characters"""
+        if result['xp_gained'] > 0:
+            self._character_list_cache.pop(user_id)
+            logger.debug(f"Awarded {result['xp_gained']} RP XP to '{result['character_name']}' (user {user_id}) - Level {old_level} -> {new_level}")
+
+        return result
+
+    async def update_character_buffer_by_id(self, character_id: int, new_buffer: int) -> bool:
+        """Update character's buffer (for RP XP accumulation)"""
         async with self.pool.acquire() as conn:
-            await conn.execute("""
+            user_id = await conn.fetchval("""
                 UPDATE characters
-                SET daily_xp = 0,
-                    char_buffer = 0,
-                    updated_at = NOW()
-                WHERE user_id = $1
-            """, user_id)
+                SET char_buffer = $2, updated_at = NOW()
+                WHERE id = $1
+                RETURNING user_id
+            """, character_id, new_buffer)
+        if user_id is None:
+            return False
+        self._invalidate_user(user_id)
+        return True
 
     async def update_character_buffer(self, user_id: int, char_name: str, new_buffer: int):
-        """Update character's buffer (for RP XP accumulation)"""
+        """Update character's buffer by name (see update_character_buffer_by_id)"""
+        character_id = await self._get_character_id(user_id, char_name, retired=None)
+        if character_id is not None:
+            await self.update_character_buffer_by_id(character_id, new_buffer)
+
+    async def flush_char_buffers(self, character_ids: List[int], buffer_deltas: List[int], local_dates: List[date]):
+        """Apply buffered char_buffer deltas to many characters in one statement
+        A delta only lands if the row's cap_day is still the day it was accrued on
+        (anything else was reset or rolled over since). Not retried here: on failure
+        the accumulator keeps the deltas for the next flush"""
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute("""
+                    UPDATE characters c
+                    SET char_buffer = GREATEST(c.char_buffer + d.delta, 0),
+                        updated_at = NOW()
+                    FROM unnest($1::int[], $2::int[], $3::date[]) AS d(id, delta, local_date)
+                    WHERE c.id = d.id
+                    AND c.cap_day = d.local_date
+                """, character_ids, buffer_deltas, local_dates)
+        except asyncpg.PostgresError as e:
+            logger.error(f"Database error flushing {len(character_ids)} character buffers: {e}")
+            raise DatabaseError(f"Failed to flush character buffers") from e
+
+    async def get_user_timezones(self) -> List[str]:
+        """Distinct timezones in use (NULL counts as UTC)"""
         async with self.pool.acquire() as conn:
-            await conn.execute("""
-                UPDATE characters
-                SET char_buffer = $3, updated_at = NOW()
-                WHERE user_id = $1 AND name = $2
-            """, user_id, char_name, new_buffer)
+            rows = await conn.fetch("SELECT DISTINCT COALESCE(timezone, 'UTC') AS timezone FROM users")
+            return [row['timezone'] for row in rows]
+
+    async def reset_daily_counters(self, timezone: str, local_date: date) -> Tuple[int, int]:
+        """Zero daily RP counters for every user in a timezone whose counters predate local_date
+        Only stale rows are touched, so running it again (or late) is harmless.
+        Returns (characters reset, users updated)"""
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    # cap_day goes to NULL rather than local_date so a late write-behind
+                    # flush of yesterday's buffer can't count toward today
+                    chars = await conn.fetch("""
+                        UPDATE characters
+                        SET daily_xp = 0, char_buffer = 0, cap_day = NULL, updated_at = NOW()
+                        WHERE user_id IN (
+                            SELECT user_id FROM users WHERE COALESCE(timezone, 'UTC') = $1
+                        )
+                        AND cap_day < $2
+                        RETURNING id, user_id
+                    """, timezone, local_date)
+                    # Deltas buffered before midnight belong to the counters being zeroed;
+                    # drop them before the reset commits so no flush can write them after it
+                    self.char_buffers.discard([row['id'] for row in chars], local_date)
+                    users = await conn.fetch("""
+                        UPDATE users
+                        SET last_xp_reset = $2, updated_at = NOW()
+                        WHERE COALESCE(timezone, 'UTC') = $1
+                        AND last_xp_reset IS DISTINCT FROM $2
+                        RETURNING user_id
+                    """, timezone, local_date)
+        except asyncpg.PostgresError as e:
+            logger.error(f"Database error resetting daily counters for timezone {timezone}: {e}")
+            raise DatabaseError(f"Failed to reset daily counters") from e
+
+        # Cached profiles carry last_xp_reset; only this timezone's users changed
+        for user_id in {row['user_id'] for row in chars} | {row['user_id'] for row in users}:
+            self._invalidate_user(user_id)
+        return len(chars), len(users)
 
     async def log_xp_grant(self, character_id: int, granted_by_user_id: int, amount: int, memo: Optional[str] = None):
         """Log an XP grant for audit trail"""
@@ -612,17 +1010,18 @@ class Database:
                 VALUES ($1, $2, $3, $4)
             """, character_id, granted_by_user_id, amount, memo)
 
-    async def update_character(self, user_id: int, old_name: str, new_name: Optional[str] = None,
-                              image_url: Optional[str] = None, character_sheet_url: Optional[str] = None) -> bool:
+    async def update_character_by_id(self, character_id: int, new_name: Optional[str] = None,
+                                     image_url: Optional[str] = None, character_sheet_url: Optional[str] = None) -> bool:
         """Update character details (name, image_url, character_sheet_url)
         Returns True if successful, False if character not found
         """
+        char = None
         try:
             async with self.pool.acquire() as conn:
                 # Get the character first to check if it exists
                 char = await conn.fetchrow(
-                    "SELECT id FROM characters WHERE user_id = $1 AND name = $2",
-                    user_id, old_name
+                    "SELECT user_id, name, retired FROM characters WHERE id = $1",
+                    character_id
                 )
 
                 if not char:
@@ -630,8 +1029,8 @@ class Database:
 
                 # Build dynamic update based on what's provided
                 updates = []
-                params = [user_id, old_name]
-                param_idx = 3
+                params = [character_id]
+                param_idx = 2
 
                 if new_name is not None:
                     updates.append(f"name = ${param_idx}")
@@ -657,20 +1056,31 @@ class Database:
                 query = f"""
                     UPDATE characters
                     SET {', '.join(updates)}
-                    WHERE user_id = $1 AND name = $2
+                    WHERE id = $1
                 """
 
                 await conn.execute(query, *params)
-                logger.info(f"Updated character '{old_name}' for user {user_id}")
+                self._character_list_cache.pop(char['user_id'])
+                if new_name is not None:
+                    self.character_names.upsert(character_id, char['user_id'], new_name, char['retired'])
+                logger.info(f"Updated character '{char['name']}' (ID: {character_id}) for user {char['user_id']}")
                 return True
 
         except asyncpg.UniqueViolationError:
-            logger.warning(f"Cannot rename '{old_name}' to '{new_name}' - name already exists for user {user_id}")
-            raise DuplicateCharacterError(new_name, user_id) from None
+            logger.warning(f"Cannot rename '{char['name']}' to '{new_name}' - name already exists for user {char['user_id']}")
+            raise DuplicateCharacterError(new_name, char['user_id']) from None
         except asyncpg.PostgresError as e:
-            logger.error(f"Database error updating character '{old_name}' for user {user_id}: {e}")
+            logger.error(f"Database error updating character {character_id}: {e}")
             raise DatabaseError(f"Failed to update character") from e
 
+    async def update_character(self, user_id: int, old_name: str, new_name: Optional[str] = None,
+                              image_url: Optional[str] = None, character_sheet_url: Optional[str] = None) -> bool:
+        """Update character details by name (see update_character_by_id)"""
+        character_id = await self._get_character_id(user_id, old_name)
+        if character_id is None:
+            return False
+        return await self.update_character_by_id(character_id, new_name, image_url, character_sheet_url)
+
     # ==================== QUEST METHODS ====================
 
     async def create_quest(self, guild_id: int, name: str, quest_type: str,
@@ -698,21 +1108,32 @@ class Database:
                                    starting_level: int, starting_xp: int):
         """Add a PC to a quest with their starting level/XP frozen"""
         async with self.pool.acquire() as conn:
+            # Counter only moves when a row was actually inserted
             await conn.execute("""
-                INSERT INTO quest_participants (quest_id, character_id, starting_level, starting_xp)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (quest_id, character_id) DO NOTHING
+                WITH inserted AS (
+                    INSERT INTO quest_participants (quest_id, character_id, starting_level, starting_xp)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (quest_id, character_id) DO NOTHING
+                    RETURNING quest_id
+                )
+                UPDATE quests SET participant_count = participant_count + 1
+                WHERE id IN (SELECT quest_id FROM inserted)
             """, quest_id, character_id, starting_level, starting_xp)
 
     async def remove_quest_participant(self, quest_id: int, character_id: int) -> bool:
         """Remove a PC from a quest. Returns True if removed, False if not found"""
         async with self.pool.acquire() as conn:
             result = await conn.execute("""
-                DELETE FROM quest_participants
-                WHERE quest_id = $1 AND character_id = $2
+                WITH removed AS (
+                    DELETE FROM quest_participants
+                    WHERE quest_id = $1 AND character_id = $2
+                    RETURNING quest_id
+                )
+                UPDATE quests SET participant_count = participant_count - 1
+                WHERE id IN (SELECT quest_id FROM removed)
             """, quest_id, character_id)
-            # result is like "DELETE N" where N is the number of rows deleted
-            return result == "DELETE 1"
+            # result is like "UPDATE N" where N is the number of quests whose count dropped
+            return result == "UPDATE 1"
 
     async def add_quest_dm(self, quest_id: int, user_id: int, username: str = None, is_primary: bool = False):
         """Add a DM to a quest"""
@@ -773,6 +1194,54 @@ class Database:
             """, quest_id)
             return dict(result) if result else None
 
+    async def get_quest_bundle(self, quest_id: Optional[int] = None, guild_id: Optional[int] = None,
+                               name: Optional[str] = None, status: str = 'active') -> Optional[Dict]:
+        """Get a quest with its participants, DMs and monsters in one query
+        Look up by quest_id, or by exact name within a guild (status 'active' by default,
+        like get_quest_by_name). Returns the quests row plus 'participants', 'dms' and 'monsters'
+        lists shaped like get_quest_participants/get_quest_dms/get_quest_monsters (DMs also
+        carry display_name, their DM profile name), or None if not found"""
+        async with self.pool.acquire() as conn:
+            if quest_id is not None:
+                return await self._fetch_quest_bundle(conn, "q.id = $1", quest_id)
+            return await self._fetch_quest_bundle(
+                conn, "q.guild_id = $1 AND q.name = $2 AND q.status = $3", guild_id, name, status
+            )
+
+    async def _fetch_quest_bundle(self, conn: asyncpg.Connection, where: str, *params) -> Optional[Dict]:
+        """Bundle query for the first quest matching `where` (a condition on quests q)"""
+        result = await conn.fetchrow(f"""
+            SELECT q.*,
+                (SELECT COALESCE(json_agg(p ORDER BY p.joined_at), '[]')
+                 FROM (
+                    SELECT qp.*, c.name AS character_name, c.user_id
+                    FROM quest_participants qp
+                    JOIN characters c ON qp.character_id = c.id
+                    WHERE qp.quest_id = q.id
+                 ) p) AS participants,
+                (SELECT COALESCE(json_agg(d ORDER BY d.is_primary DESC, d.joined_at), '[]')
+                 FROM (
+                    SELECT qd.*, COALESCE(dp.preferred_dm_name, qd.username, 'DM_' || qd.user_id) AS display_name
+                    FROM quest_dms qd
+                    LEFT JOIN dm_profiles dp ON dp.user_id = qd.user_id
+                    WHERE qd.quest_id = q.id
+                 ) d) AS dms,
+                (SELECT COALESCE(json_agg(qm ORDER BY qm.added_at), '[]')
+                 FROM quest_monsters qm
+                 WHERE qm.quest_id = q.id) AS monsters
+            FROM quests q
+            WHERE {where}
+            ORDER BY q.id DESC
+            LIMIT 1
+        """, *params)
+        if not result:
+            return None
+
+        bundle = dict(result)
+        for key in ('participants', 'dms', 'monsters'):
+            bundle[key] = decode_json_rows(bundle[key])
+        return bundle
+
     async def get_active_quests(self, guild_id: int) -> List[Dict]:
         """Get all active quests for a guild"""
         async with self.pool.acquire() as conn:
@@ -793,6 +1262,81 @@ class Database:
             """, guild_id)
             return [dict(r) for r in results]
 
+    async def get_quests_with_summary(self, guild_id: int, status: str = 'active', limit: int = 25) -> List[Dict]:
+        """Get the most recent quests with DM names in one query
+        Active quests are ordered newest start first, completed ones newest end first.
+        Each dict is a quests row (including the participant_count, monster_count and
+        total_monster_xp counters) plus dm_names (primary first)"""
+        if status not in QUEST_SORT_COLUMNS:
+            raise ValueError(f"Unknown quest status: {status}")
+        sort_column = QUEST_SORT_COLUMNS[status]
+
+        query = f"""
+            SELECT q.*, d.dm_names
+            FROM quests q
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(
+                    array_agg(COALESCE(dp.preferred_dm_name, qd.username, 'DM_' || qd.user_id)
+                              ORDER BY qd.is_primary DESC, qd.joined_at),
+                    '{{}}'
+                ) AS dm_names
+                FROM quest_dms qd
+                LEFT JOIN dm_profiles dp ON dp.user_id = qd.user_id
+                WHERE qd.quest_id = q.id
+            ) d
+            WHERE q.guild_id = $1 AND q.status = $2
+            ORDER BY q.{sort_column} DESC, q.id DESC
+            LIMIT $3
+        """
+        async with self.pool.acquire() as conn:
+            results = await conn.fetch(query, guild_id, status, limit)
+            return [dict(r) for r in results]
+
+    async def check_quest_counters(self, guild_id: int, repair: bool = False) -> List[Dict]:
+        """Compare a guild's stored quest counters with their source rows
+        Returns drifted quests (id, name, stored and actual values); with repair=True the
+        counters are reset to the actual values in the same statement"""
+        actual = """
+            SELECT q.id, q.name,
+                   q.participant_count, q.monster_count, q.total_monster_xp,
+                   (SELECT COUNT(*)::int FROM quest_participants qp WHERE qp.quest_id = q.id) AS actual_participant_count,
+                   m.actual_monster_count, m.actual_total_monster_xp
+            FROM quests q
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(SUM(qm.count), 0)::int AS actual_monster_count,
+                       COALESCE(SUM(cx.xp * qm.count), 0)::int AS actual_total_monster_xp
+                FROM quest_monsters qm
+                JOIN unnest($2::text[], $3::int[]) AS cx(cr, xp) ON cx.cr = qm.cr
+                WHERE qm.quest_id = q.id
+            ) m
+            WHERE q.guild_id = $1
+        """
+        drift = f"""
+            SELECT * FROM ({actual}) a
+            WHERE (a.participant_count, a.monster_count, a.total_monster_xp)
+                IS DISTINCT FROM (a.actual_participant_count, a.actual_monster_count, a.actual_total_monster_xp)
+        """
+        params = [guild_id, list(CR_TO_XP.keys()), list(CR_TO_XP.values())]
+
+        async with self.pool.acquire() as conn:
+            if not repair:
+                results = await conn.fetch(drift + " ORDER BY a.id", *params)
+                return [dict(r) for r in results]
+
+            results = await conn.fetch(f"""
+                WITH drift AS ({drift})
+                UPDATE quests q
+                SET participant_count = d.actual_participant_count,
+                    monster_count = d.actual_monster_count,
+                    total_monster_xp = d.actual_total_monster_xp
+                FROM drift d
+                WHERE q.id = d.id
+                RETURNING d.*
+            """, *params)
+            if results:
+                logger.warning(f"Repaired summary counters on {len(results)} quest(s) in guild {guild_id}")
+            return sorted((dict(r) for r in results), key=lambda r: r['id'])
+
     async def get_quest_participants(self, quest_id: int) -> List[Dict]:
         """Get all participants (PCs) in a quest with character details"""
         async with self.pool.acquire() as conn:
@@ -818,11 +1362,20 @@ class Database:
     async def add_quest_monster(self, quest_id: int, cr: str,
                                monster_name: str = None, count: int = 1):
         """Add a monster/encounter to a quest"""
+        # Unknown CRs are stored but don't count, as in calculate_quest_xp
+        xp_per_monster = CR_TO_XP.get(cr)
+        counted = count if xp_per_monster is not None else 0
         async with self.pool.acquire() as conn:
             await conn.execute("""
-                INSERT INTO quest_monsters (quest_id, monster_name, cr, count)
-                VALUES ($1, $2, $3, $4)
-            """, quest_id, monster_name, cr, count)
+                WITH inserted AS (
+                    INSERT INTO quest_monsters (quest_id, monster_name, cr, count)
+                    VALUES ($1, $2, $3, $4)
+                    RETURNING quest_id
+                )
+                UPDATE quests
+                SET monster_count = monster_count + $5, total_monster_xp = total_monster_xp + $6
+                WHERE id IN (SELECT quest_id FROM inserted)
+            """, quest_id, monster_name, cr, count, counted, counted * (xp_per_monster or 0))
 
     async def get_quest_monsters(self, quest_id: int) -> List[Dict]:
         """Get all monsters/encounters for a quest"""
@@ -835,15 +1388,127 @@ class Database:
             return [dict(r) for r in results]
 
     async def complete_quest(self, quest_id: int, end_date: date) -> bool:
-        """Mark a quest as completed"""
+        """Mark a quest as completed and freeze its snapshot (same transaction)"""
         async with self.pool.acquire() as conn:
-            result = await conn.execute("""
-                UPDATE quests
-                SET status = 'completed', end_date = $2, updated_at = NOW()
-                WHERE id = $1 AND status = 'active'
-            """, quest_id, end_date)
-            # Check if any rows were updated
-            return result.split()[-1] != '0'
+            async with conn.transaction():
+                return await self._complete_quest(conn, quest_id, end_date) is not None
+
+    async def complete_quest_and_award_xp(self, quest_id: int, end_date: date, granted_by_user_id: int,
+                                          memo: Optional[str] = None) -> Optional[Dict]:
+        """Complete a quest and award each participant its XP per PC, all in one transaction
+        Returns None if the quest wasn't active, otherwise dict with: xp_per_pc, awards (one dict
+        per non-retired participant: character_id, user_id, name, image_url, character_sheet_url, old_xp,
+        new_xp, old_level, new_level, leveled_up)"""
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    snapshot = await self._complete_quest(conn, quest_id, end_date)
+                    if snapshot is None:
+                        return None
+
+                    xp_per_pc = snapshot['xp_per_pc']
+                    character_ids = [p['character_id'] for p in snapshot['participants']]
+                    if xp_per_pc <= 0 or not character_ids:
+                        return {'xp_per_pc': xp_per_pc, 'awards': []}
+
+                    # One set-based award for every participant; retired characters are skipped,
+                    # as /xp_grant only finds active ones
+                    rows = await conn.fetch("""
+                        UPDATE characters c
+                        SET xp = c.xp + a.amount, updated_at = NOW()
+                        FROM unnest($1::int[], $2::int[]) AS a(id, amount)
+                        WHERE c.id = a.id AND c.retired = FALSE
+                        RETURNING c.id AS character_id, c.user_id, c.name, c.image_url, c.character_sheet_url,
+                                  c.xp - a.amount AS old_xp, c.xp AS new_xp
+                    """, character_ids, [xp_per_pc] * len(character_ids))
+
+                    await conn.executemany("""
+                        INSERT INTO xp_grants (character_id, granted_by_user_id, amount, memo)
+                        VALUES ($1, $2, $3, $4)
+                    """, [(row['character_id'], granted_by_user_id, xp_per_pc, memo) for row in rows])
+        except asyncpg.PostgresError as e:
+            logger.error(f"Database error awarding XP for quest {quest_id}: {e}")
+            raise DatabaseError(f"Failed to award quest XP") from e
+
+        awards = []
+        # Participant (join) order
+        position = {character_id: i for i, character_id in enumerate(character_ids)}
+        for row in sorted(rows, key=lambda r: position[r['character_id']]):
+            award = dict(row)
+            award['old_level'], _, _ = get_level_and_progress(award['old_xp'])
+            award['new_level'], _, _ = get_level_and_progress(award['new_xp'])
+            award['leveled_up'] = award['new_level'] > award['old_level']
+            awards.append(award)
+            self._character_list_cache.pop(award['user_id'])
+
+        logger.info(f"Awarded {xp_per_pc} XP to {len(awards)} participant(s) of quest {quest_id}")
+        return {'xp_per_pc': xp_per_pc, 'awards': awards}
+
+    async def _complete_quest(self, conn: asyncpg.Connection, quest_id: int, end_date: date) -> Optional[Dict]:
+        """Complete an active quest inside the caller's transaction, returning its snapshot
+        (None if the quest wasn't active)"""
+        result = await conn.execute("""
+            UPDATE quests
+            SET status = 'completed', end_date = $2, updated_at = NOW()
+            WHERE id = $1 AND status = 'active'
+        """, quest_id, end_date)
+        # Check if any rows were updated
+        if result.split()[-1] == '0':
+            return None
+
+        return await self._save_quest_snapshot(conn, quest_id)
+
+    async def _save_quest_snapshot(self, conn: asyncpg.Connection, quest_id: int) -> Optional[Dict]:
+        """Build and store a quest's snapshot, returning it (None if the quest doesn't exist)
+        Existing snapshots are never overwritten"""
+        bundle = await self._fetch_quest_bundle(conn, "q.id = $1", quest_id)
+        if not bundle:
+            return None
+        snapshot = build_quest_snapshot(bundle)
+        await conn.execute("""
+            INSERT INTO quest_snapshots (quest_id, snapshot)
+            VALUES ($1, $2::jsonb)
+            ON CONFLICT (quest_id) DO NOTHING
+        """, quest_id, json.dumps(snapshot))
+        return snapshot
+
+    async def get_completed_quest_snapshot(self, guild_id: int, name: str) -> Optional[Dict]:
+        """Get a completed quest by exact name with its frozen snapshot, in one row fetch
+        'snapshot' is None for quests completed before snapshots existed and not yet backfilled"""
+        async with self.pool.acquire() as conn:
+            result = await conn.fetchrow("""
+                SELECT q.*, s.snapshot
+                FROM quests q
+                LEFT JOIN quest_snapshots s ON s.quest_id = q.id
+                WHERE q.guild_id = $1 AND q.name = $2 AND q.status = 'completed'
+                ORDER BY q.end_date DESC
+                LIMIT 1
+            """, guild_id, name)
+            if not result:
+                return None
+
+            quest = dict(result)
+            if quest['snapshot'] is not None:
+                quest['snapshot'] = json.loads(quest['snapshot'])
+            return quest
+
+    async def backfill_quest_snapshots(self, guild_id: int) -> int:
+        """Write snapshots for a guild's completed quests that don't have one, returning how many"""
+        async with self.pool.acquire() as conn:
+            quest_ids = await conn.fetch("""
+                SELECT q.id FROM quests q
+                WHERE q.guild_id = $1 AND q.status = 'completed'
+                  AND NOT EXISTS (SELECT 1 FROM quest_snapshots s WHERE s.quest_id = q.id)
+                ORDER BY q.id
+            """, guild_id)
+
+            count = 0
+            for row in quest_ids:
+                if await self._save_quest_snapshot(conn, row['id']) is not None:
+                    count += 1
+
+            logger.info(f"Backfilled {count} quest snapshot(s) for guild {guild_id}")
+            return count
 
     async def delete_quest(self, quest_id: int) -> bool:
         """Delete a quest (only if active). Cascades to participants, DMs, and monsters.
@@ -868,15 +1533,16 @@ class Database:
             return [dict(r) for r in results]
 
     async def search_active_quests(self, guild_id: int, search_term: str, limit: int = 25) -> List[str]:
-        """Search active quest names for autocomplete"""
+        """Search active quest names for autocomplete (best matches first, then newest)"""
+        rank = f"{self._name_rank('$2')}, " if search_term else ""
         async with self.pool.acquire() as conn:
-            results = await conn.fetch("""
+            results = await conn.fetch(f"""
                 SELECT name FROM quests
                 WHERE guild_id = $1 AND status = 'active'
-                AND LOWER(name) LIKE LOWER($2)
-                ORDER BY start_date DESC
+                AND lower(name) LIKE '%' || lower($2) || '%'
+                ORDER BY {rank}start_date DESC
                 LIMIT $3
-            """, guild_id, f"%{search_term}%", limit)
+            """, guild_id, search_term, limit)
             return [r['name'] for r in results]
 
     async def get_quest_by_name(self, guild_id: int, name: str) -> Optional[Dict]:
@@ -900,15 +1566,16 @@ class Database:
             return dict(result) if result else None
 
     async def search_completed_quests(self, guild_id: int, search_term: str, limit: int = 25) -> List[str]:
-        """Search completed quest names for autocomplete"""
+        """Search completed quest names for autocomplete (best matches first, then most recent)"""
+        rank = f"{self._name_rank('$2')}, " if search_term else ""
         async with self.pool.acquire() as conn:
-            results = await conn.fetch("""
+            results = await conn.fetch(f"""
                 SELECT name FROM quests
                 WHERE guild_id = $1 AND status = 'completed'
-                AND LOWER(name) LIKE LOWER($2)
-                ORDER BY end_date DESC
+                AND lower(name) LIKE '%' || lower($2) || '%'
+                ORDER BY {rank}end_date DESC
                 LIMIT $3
-            """, guild_id, f"%{search_term}%", limit)
+            """, guild_id, search_term, limit)
             return [r['name'] for r in results]
 
     async def get_completed_quest_by_name(self, guild_id: int, name: str) -> Optional[Dict]:
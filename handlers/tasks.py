@@ -0,0 +1,111 @@
+"""
+Background tasks for XP Bot - periodic write-behind flushes, daily counter resets and name index refreshes
+"""
+import time
+import heapq
+import asyncio
+import logging
+from discord.ext import tasks
+from utils.exceptions import DatabaseError
+from utils.xp import get_local_date, get_next_local_midnight
+from utils.name_index import REFRESH_INTERVAL
+
+logger = logging.getLogger('xp-bot')
+
+# Upper bound on how long the reset scheduler sleeps before rescanning for new timezones
+TIMEZONE_RESCAN_INTERVAL = 3600
+# Delay before retrying a timezone whose reset failed
+RESET_RETRY_DELAY = 60
+
+
+async def run_daily_resets(db):
+    """Zero daily RP counters at each timezone's local midnight
+    Every known timezone is due immediately on startup, which catches up after downtime;
+    afterwards each one is rescheduled for its next local midnight."""
+    await db.wait_until_connected()
+
+    # (run_at unix time, timezone) - earliest midnight first
+    upcoming = []
+    scheduled = set()
+
+    while True:
+        try:
+            for tz in await db.get_user_timezones():
+                if tz not in scheduled:
+                    scheduled.add(tz)
+                    heapq.heappush(upcoming, (0.0, tz))
+        except DatabaseError:
+            pass  # Already logged; keep the zones we know about
+        except Exception as e:
+            logger.error(f"Failed to load user timezones for daily resets: {e}")
+
+        while upcoming and upcoming[0][0] <= time.time():
+            _, tz = heapq.heappop(upcoming)
+            local_date = get_local_date(tz)
+            start = time.perf_counter()
+            try:
+                chars, users = await db.reset_daily_counters(tz, local_date)
+            except Exception as e:
+                logger.error(f"Daily reset for timezone {tz} failed, retrying in {RESET_RETRY_DELAY}s: {e}")
+                heapq.heappush(upcoming, (time.time() + RESET_RETRY_DELAY, tz))
+                continue
+
+            elapsed = time.perf_counter() - start
+            logger.info(f"Daily reset for {tz} ({local_date}): {chars} characters, {users} users in {elapsed * 1000:.1f}ms")
+            heapq.heappush(upcoming, (get_next_local_midnight(tz).timestamp(), tz))
+
+        delay = TIMEZONE_RESCAN_INTERVAL
+        if upcoming:
+            delay = min(delay, upcoming[0][0] - time.time())
+        await asyncio.sleep(max(delay, 1))
+
+
+def setup_tasks(bot, db):
+    """Register background tasks with the bot
+    Returns (start_tasks, stop_tasks): start once the database is connected, stop on shutdown
+    (stop_tasks is a coroutine function that also flushes pending state)"""
+    daily_reset_task = None
+
+    @tasks.loop(seconds=db.char_buffers.flush_interval)
+    async def flush_char_buffers():
+        """Write buffered RP progress back to the database"""
+        try:
+            await db.char_buffers.flush()
+        except DatabaseError:
+            pass  # Already logged; deltas are kept for the next flush
+
+    @tasks.loop(seconds=REFRESH_INTERVAL)
+    async def refresh_character_names():
+        """Rebuild the character name index to pick up writes from other processes"""
+        if refresh_character_names.current_loop == 0:
+            return  # Loaded during startup
+        try:
+            await db.load_character_names()
+        except Exception as e:
+            logger.error(f"Failed to refresh character name index: {e}")
+
+    def start_tasks():
+        nonlocal daily_reset_task
+        if not flush_char_buffers.is_running():
+            flush_char_buffers.start()
+            logger.info(f"Started character buffer flush task (every {db.char_buffers.flush_interval:g}s)")
+        if not refresh_character_names.is_running():
+            refresh_character_names.start()
+        bot.notifications.start()
+        bot.rp_pipeline.start()
+        if daily_reset_task is None or daily_reset_task.done():
+            daily_reset_task = asyncio.create_task(run_daily_resets(db))
+            logger.info("Started daily reset scheduler")
+
+    async def stop_tasks():
+        if daily_reset_task is not None:
+            daily_reset_task.cancel()
+        flush_char_buffers.stop()
+        refresh_character_names.cancel()
+        await bot.rp_pipeline.stop()
+        await bot.notifications.stop()
+        if db.pool:
+            flushed = await db.char_buffers.flush()
+            logger.info(f"Flushed {flushed} character buffers on shutdown")
+
+    return start_tasks, stop_tasks
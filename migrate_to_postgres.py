@@ -101,16 +101,13 @@ async def migrate():
             # Update character with XP and daily stats
             xp = char_data.get('xp', 0)
             daily_xp = char_data.get('daily_xp', 0)
-            daily_hf = char_data.get('daily_hf', 0)
             char_buffer = char_data.get('char_buffer', 0)
 
-            if xp or daily_xp or daily_hf or char_buffer:
-                await db.award_xp(
-                    user_id,
-                    char_name,
+            if xp or daily_xp or char_buffer:
+                await db.award_xp_by_id(
+                    char_id,
                     xp,  # Set total XP
                     daily_xp_delta=daily_xp - 0,  # Set current daily_xp
-                    daily_hf_delta=daily_hf - 0,  # Set current daily_hf
                     char_buffer_delta=char_buffer - 0  # Set current buffer
                 )
 
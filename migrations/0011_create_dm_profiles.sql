@@ -20,6 +20,7 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS dm_profile_updated ON dm_profiles;
 CREATE TRIGGER dm_profile_updated
     BEFORE UPDATE ON dm_profiles
     FOR EACH ROW
@@ -0,0 +1,14 @@
+-- Migration: Add cap_day to characters for lazy daily caps
+-- daily_xp and char_buffer only count when cap_day matches the user's local date,
+-- so daily resets no longer need to write anything.
+
+-- Add cap_day column
+ALTER TABLE characters
+ADD COLUMN IF NOT EXISTS cap_day DATE;
+
+-- Existing counters belong to the owner's last reset day
+UPDATE characters c
+SET cap_day = u.last_xp_reset
+FROM users u
+WHERE u.user_id = c.user_id
+  AND c.cap_day IS NULL;
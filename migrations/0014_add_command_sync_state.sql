@@ -0,0 +1,8 @@
+-- Migration: Track the last synced slash command payload
+-- The bot only re-syncs a scope (global or one guild) when the hash of its payload changes
+
+CREATE TABLE IF NOT EXISTS command_sync_state (
+    scope VARCHAR(100) PRIMARY KEY,  -- '<application_id>:global' or '<application_id>:guild:<guild_id>'
+    payload_hash CHAR(64) NOT NULL,
+    synced_at TIMESTAMP DEFAULT NOW()
+);
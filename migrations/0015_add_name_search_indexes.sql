@@ -0,0 +1,45 @@
+-- Migration: Indexes for character and quest name autocomplete
+-- Substring search uses pg_trgm GIN indexes on lower(name); the empty-search branches
+-- (most recent names first) use partial btree indexes.
+
+-- pg_trgm ships with standard Postgres builds (contrib) and is a trusted extension,
+-- but skip the trigram indexes rather than fail where it isn't installed
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        -- A role without CREATE on the database can't install it; the block's exception
+        -- handler rolls back just this part so the migration (and startup) still succeeds
+        BEGIN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+            CREATE INDEX IF NOT EXISTS idx_characters_name_trgm
+                ON characters USING gin (lower(name) gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS idx_characters_name_trgm_active
+                ON characters USING gin (lower(name) gin_trgm_ops)
+                WHERE retired = FALSE;
+            CREATE INDEX IF NOT EXISTS idx_quests_name_trgm_active
+                ON quests USING gin (lower(name) gin_trgm_ops)
+                WHERE status = 'active';
+            CREATE INDEX IF NOT EXISTS idx_quests_name_trgm_completed
+                ON quests USING gin (lower(name) gin_trgm_ops)
+                WHERE status = 'completed';
+        EXCEPTION WHEN insufficient_privilege THEN
+            RAISE NOTICE 'Not allowed to create pg_trgm; name search will not use trigram indexes';
+        END;
+    ELSE
+        RAISE NOTICE 'pg_trgm is not available; name search will not use trigram indexes';
+    END IF;
+END $$;
+
+-- Recently updated characters (autocomplete with no search text)
+CREATE INDEX IF NOT EXISTS idx_characters_updated_active
+    ON characters (updated_at DESC)
+    WHERE retired = FALSE;
+
+-- Per-guild quest lists in display order
+CREATE INDEX IF NOT EXISTS idx_quests_guild_active
+    ON quests (guild_id, start_date DESC)
+    WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_quests_guild_completed
+    ON quests (guild_id, end_date DESC)
+    WHERE status = 'completed';
@@ -0,0 +1,10 @@
+-- Migration: Frozen snapshots of completed quests
+-- Written in the same transaction that completes a quest, so history views read one row
+-- instead of re-joining participants/DMs/monsters and recalculating XP.
+-- Older completed quests are filled in by /xp_backfill_quest_snapshots
+
+CREATE TABLE IF NOT EXISTS quest_snapshots (
+    quest_id INTEGER PRIMARY KEY REFERENCES quests(id) ON DELETE CASCADE,
+    snapshot JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
@@ -0,0 +1,60 @@
+-- Migration: Denormalized quest summary counters
+-- participant_count, monster_count and total_monster_xp are kept current by the bot's
+-- quest write paths (see Database.add_quest_participant/remove_quest_participant/add_quest_monster),
+-- so list views read only the quests table. Monsters with an unknown CR don't count, matching
+-- calculate_quest_xp. /xp_check_quest_counters finds and repairs any drift.
+
+ALTER TABLE quests ADD COLUMN IF NOT EXISTS participant_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE quests ADD COLUMN IF NOT EXISTS monster_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE quests ADD COLUMN IF NOT EXISTS total_monster_xp INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill existing quests (CR -> XP as in utils/quest_xp.CR_TO_XP)
+UPDATE quests q
+SET participant_count = (SELECT COUNT(*) FROM quest_participants qp WHERE qp.quest_id = q.id),
+    monster_count = m.monster_count,
+    total_monster_xp = m.total_monster_xp
+FROM (
+    SELECT q2.id,
+           COALESCE(SUM(qm.count) FILTER (WHERE cx.xp IS NOT NULL), 0) AS monster_count,
+           COALESCE(SUM(qm.count * cx.xp), 0) AS total_monster_xp
+    FROM quests q2
+    LEFT JOIN quest_monsters qm ON qm.quest_id = q2.id
+    LEFT JOIN (VALUES
+        ('0', 0),
+        ('1/8', 25),
+        ('1/4', 50),
+        ('1/2', 100),
+        ('1', 200),
+        ('2', 450),
+        ('3', 700),
+        ('4', 1100),
+        ('5', 1800),
+        ('6', 2300),
+        ('7', 2900),
+        ('8', 3900),
+        ('9', 5000),
+        ('10', 5900),
+        ('11', 7200),
+        ('12', 8400),
+        ('13', 10000),
+        ('14', 11500),
+        ('15', 13000),
+        ('16', 15000),
+        ('17', 18000),
+        ('18', 20000),
+        ('19', 22000),
+        ('20', 25000),
+        ('21', 33000),
+        ('22', 41000),
+        ('23', 50000),
+        ('24', 62000),
+        ('25', 75000),
+        ('26', 90000),
+        ('27', 105000),
+        ('28', 120000),
+        ('29', 135000),
+        ('30', 155000)
+    ) AS cx(cr, xp) ON cx.cr = qm.cr
+    GROUP BY q2.id
+) m
+WHERE m.id = q.id;
@@ -0,0 +1,89 @@
+-- Migration: process_rp_message() for single round-trip RP message processing
+-- (previously appended to the baseline schema; relies on characters.cap_day from 0013)
+
+-- RP message processing (one round trip per tracked message)
+-- Upserts the user, accumulates the active character's buffer, clamps to the daily cap
+-- and awards XP atomically. Daily counters are lazy: daily_xp and char_buffer only count
+-- when characters.cap_day is the user's current local date, so a new day needs no reset write.
+-- p_local_date may be NULL to derive the local date from users.timezone.
+-- Returns no row when the user has no active (non-retired) character.
+-- local_date/timezone are returned so the bot-side buffer accumulator can detect day rollovers.
+DROP FUNCTION IF EXISTS process_rp_message(BIGINT, INTEGER, DATE, INTEGER, INTEGER);
+CREATE FUNCTION process_rp_message(
+    p_user_id BIGINT,
+    p_char_count INTEGER,
+    p_local_date DATE,
+    p_char_per_rp INTEGER,
+    p_daily_cap INTEGER
+)
+RETURNS TABLE (
+    character_id INTEGER,
+    character_name VARCHAR,
+    old_xp INTEGER,
+    new_xp INTEGER,
+    xp_gained INTEGER,
+    char_buffer INTEGER,
+    daily_xp INTEGER,
+    image_url TEXT,
+    character_sheet_url TEXT,
+    local_date DATE,
+    timezone VARCHAR
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_user users%ROWTYPE;
+    v_char characters%ROWTYPE;
+    v_local_date DATE := p_local_date;
+    v_daily_xp INTEGER;
+    v_total INTEGER;
+    v_gained INTEGER;
+BEGIN
+    SELECT * INTO v_user FROM users WHERE user_id = p_user_id;
+
+    IF NOT FOUND THEN
+        INSERT INTO users (user_id, timezone, last_xp_reset)
+        VALUES (p_user_id, 'UTC', CURRENT_DATE)
+        ON CONFLICT (user_id) DO NOTHING;
+        SELECT * INTO v_user FROM users WHERE user_id = p_user_id;
+    END IF;
+
+    IF v_local_date IS NULL THEN
+        BEGIN
+            v_local_date := (NOW() AT TIME ZONE COALESCE(v_user.timezone, 'UTC'))::date;
+        EXCEPTION WHEN invalid_parameter_value THEN
+            v_local_date := (NOW() AT TIME ZONE 'UTC')::date;
+        END;
+    END IF;
+
+    -- Row lock serializes concurrent messages for the same character
+    SELECT * INTO v_char FROM characters
+    WHERE id = v_user.active_character_id AND retired = FALSE
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    IF v_char.cap_day IS NOT DISTINCT FROM v_local_date THEN
+        v_daily_xp := COALESCE(v_char.daily_xp, 0);
+        v_total := COALESCE(v_char.char_buffer, 0) + p_char_count;
+    ELSE
+        -- Counters belong to an earlier day: treat them as zero
+        v_daily_xp := 0;
+        v_total := p_char_count;
+    END IF;
+
+    v_gained := GREATEST(LEAST(v_total / p_char_per_rp, p_daily_cap - v_daily_xp), 0);
+
+    RETURN QUERY
+    UPDATE characters c
+    SET xp = c.xp + v_gained,
+        daily_xp = v_daily_xp + v_gained,
+        char_buffer = v_total % p_char_per_rp,
+        cap_day = v_local_date,
+        updated_at = NOW()
+    WHERE c.id = v_char.id
+    RETURNING c.id, c.name, c.xp - v_gained, c.xp, v_gained, c.char_buffer, c.daily_xp,
+              c.image_url, c.character_sheet_url, v_local_date, v_user.timezone;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,104 @@
+"""
+RP character buffer accumulator against a real Postgres database
+
+Set TEST_DATABASE_URL to a scratch database to run (the tests write users and characters).
+"""
+import os
+import random
+import asyncio
+from datetime import timedelta
+import pytest
+from database import Database
+from utils.xp import get_local_date
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+CHAR_PER_RP = 100
+DAILY_CAP = 1
+
+
+async def _with_db(monkeypatch, test):
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    db = Database()
+    await db.connect()
+    try:
+        await db.initialize_schema()
+        await test(db)
+    finally:
+        await db.close()
+
+
+async def _buffer_at_cap(db):
+    """Create a character that reached the daily cap with a buffered negative delta
+    Returns (user_id, character_id); the row holds 50 chars, memory says 30"""
+    user_id = random.randint(10**15, 10**16)
+    character_id = await db.create_character(user_id, "Buffered")
+    buffers = db.char_buffers
+
+    result = await buffers.process_message(user_id, 150, CHAR_PER_RP, DAILY_CAP)
+    assert (result['xp_gained'], result['char_buffer']) == (1, 50)
+
+    # At the cap 50 + 80 wraps to 30: buffered in memory as a -20 delta
+    assert await buffers.process_message(user_id, 80, CHAR_PER_RP, DAILY_CAP) is None
+    return user_id, character_id
+
+
+async def _char_buffer(db, character_id):
+    async with db.pool.acquire() as conn:
+        return await conn.fetchval("SELECT char_buffer FROM characters WHERE id = $1", character_id)
+
+
+def test_negative_delta_survives_invalidation(monkeypatch):
+    async def test(db):
+        user_id, character_id = await _buffer_at_cap(db)
+        db.char_buffers.invalidate(user_id)
+
+        result = await db.char_buffers.process_message(user_id, 60, CHAR_PER_RP, DAILY_CAP)
+        await db.char_buffers.flush()
+
+        # 50 + 80 + 60 = 190 chars at the cap
+        assert result['char_buffer'] == 90
+        assert await _char_buffer(db, character_id) == 90
+
+    asyncio.run(_with_db(monkeypatch, test))
+
+
+def test_flush_skips_rows_reset_since(monkeypatch):
+    async def test(db):
+        user_id, character_id = await _buffer_at_cap(db)
+        async with db.pool.acquire() as conn:
+            await conn.execute("UPDATE characters SET char_buffer = 10, cap_day = NULL WHERE id = $1", character_id)
+        db.char_buffers.invalidate(user_id)
+
+        await db.char_buffers.flush()
+
+        assert await _char_buffer(db, character_id) == 10
+
+    asyncio.run(_with_db(monkeypatch, test))
+
+
+def test_flush_never_goes_below_zero(monkeypatch):
+    async def test(db):
+        user_id, character_id = await _buffer_at_cap(db)
+        async with db.pool.acquire() as conn:
+            await conn.execute("UPDATE characters SET char_buffer = 5 WHERE id = $1", character_id)
+
+        await db.char_buffers.flush()
+
+        assert await _char_buffer(db, character_id) == 0
+
+    asyncio.run(_with_db(monkeypatch, test))
+
+
+def test_daily_reset_discards_buffered_deltas(monkeypatch):
+    async def test(db):
+        user_id, character_id = await _buffer_at_cap(db)
+
+        await db.reset_daily_counters('UTC', get_local_date('UTC') + timedelta(days=1))
+        assert await db.char_buffers.flush() == 0
+
+        assert await _char_buffer(db, character_id) == 0
+
+    asyncio.run(_with_db(monkeypatch, test))
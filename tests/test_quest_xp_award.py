@@ -0,0 +1,61 @@
+"""
+Quest completion XP award against a real Postgres database
+
+Set TEST_DATABASE_URL to a scratch database to run (the tests write quests and characters).
+"""
+import os
+import random
+import asyncio
+from datetime import date
+import pytest
+from database import Database
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+async def _with_db(monkeypatch, test):
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    db = Database()
+    await db.connect()
+    try:
+        await db.initialize_schema()
+        await test(db)
+    finally:
+        await db.close()
+
+
+def test_award_skips_retired_participants(monkeypatch):
+    async def test(db):
+        guild_id = random.randint(10**15, 10**16)
+        active_user, retired_user = guild_id + 1, guild_id + 2
+
+        active_id = await db.create_character(active_user, "Active")
+        retired_id = await db.create_character(retired_user, "Retired", starting_xp=100)
+        quest_id = await db.create_quest(guild_id, "Award Test", "Standard", "1-4", date(2026, 1, 1), guild_id + 3)
+        await db.add_quest_participant(quest_id, active_id, 1, 0)
+        await db.add_quest_participant(quest_id, retired_id, 1, 100)
+        await db.add_quest_monster(quest_id, "2", "Ogre", 2)  # 900 XP, 450 per PC
+        await db.retire_character_by_id(retired_id)
+
+        result = await db.complete_quest_and_award_xp(quest_id, date(2026, 1, 2), guild_id + 3, memo="Quest: Award Test")
+
+        assert result['xp_per_pc'] == 450
+        assert [a['character_id'] for a in result['awards']] == [active_id]
+        assert result['awards'][0]['new_xp'] == 450
+
+        retired = await db.get_character_by_id(retired_id, include_retired=True)
+        assert retired['xp'] == 100
+
+        async with db.pool.acquire() as conn:
+            grants = await conn.fetch(
+                "SELECT character_id, amount FROM xp_grants WHERE character_id = ANY($1::int[])",
+                [active_id, retired_id]
+            )
+        assert [(g['character_id'], g['amount']) for g in grants] == [(active_id, 450)]
+
+        # Already completed: nothing more is awarded
+        assert await db.complete_quest_and_award_xp(quest_id, date(2026, 1, 2), guild_id + 3) is None
+
+    asyncio.run(_with_db(monkeypatch, test))
@@ -14,9 +14,10 @@ DEFAULT_CHARACTER_IMAGE = "https://placehold.co/400x400/5865F2/FFFFFF/png?text=N
 class RetireConfirmationView(discord.ui.View):
     """Confirmation view for retiring a character (double opt-in)"""
 
-    def __init__(self, user_id: int, char_name: str, db, parent_view):
+    def __init__(self, user_id: int, character_id: int, char_name: str, db, parent_view):
         super().__init__(timeout=60)  # 1 minute timeout for confirmation
         self.user_id = user_id
+        self.character_id = character_id
         self.char_name = char_name
         self.db = db
         self.parent_view = parent_view
@@ -30,7 +31,7 @@ class RetireConfirmationView(discord.ui.View):
             return
 
         # Retire the character
-        success = await self.db.retire_character(self.user_id, self.char_name)
+        success = await self.db.retire_character_by_id(self.character_id)
 
         if success:
             self.confirmed = True
@@ -221,7 +222,7 @@ class CharacterNavigationView(discord.ui.View):
         char_name = char['name']
 
         # Set as active
-        await self.db.set_active_character(self.target_user_id, char_name)
+        await self.db.set_active_character_by_id(self.target_user_id, char['id'])
         self.active_char_name = char_name
 
         # Update buttons and embed
@@ -242,7 +243,7 @@ class CharacterNavigationView(discord.ui.View):
         char_name = char['name']
 
         # Show confirmation view
-        confirmation_view = RetireConfirmationView(self.viewer_user_id, char_name, self.db, self)
+        confirmation_view = RetireConfirmationView(self.viewer_user_id, char['id'], char_name, self.db, self)
 
         await interaction.response.send_message(
             f"⚠️ **Are you sure you want to retire '{char_name}'?**\n\n"
@@ -4,6 +4,7 @@ Quest confirmation and interaction views
 import logging
 import discord
 from datetime import date
+from utils.notifications import LevelUpEvent
 
 logger = logging.getLogger('xp-bot')
 
@@ -32,9 +33,23 @@ class QuestEndConfirmView(discord.ui.View):
     @discord.ui.button(label="Confirm End Quest", style=discord.ButtonStyle.success)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Confirm quest completion"""
+        await self._complete(interaction, award_xp=False)
+
+    @discord.ui.button(label="End Quest & Award XP", style=discord.ButtonStyle.primary)
+    async def confirm_and_award(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Confirm quest completion and award the XP per PC to every participant"""
+        await self._complete(interaction, award_xp=True)
+
+    async def _complete(self, interaction: discord.Interaction, award_xp: bool):
         try:
-            # Complete the quest
-            success = await self.db.complete_quest(self.quest_id, self.end_date)
+            # Complete the quest (and award XP in the same transaction)
+            if award_xp:
+                award = await self.db.complete_quest_and_award_xp(
+                    self.quest_id, self.end_date, interaction.user.id, memo=f"Quest: {self.quest_name}"
+                )
+                success = award is not None
+            else:
+                success = await self.db.complete_quest(self.quest_id, self.end_date)
             if not success:
                 await interaction.response.send_message(
                     f"Quest '{self.quest_name}' could not be completed (may already be completed).",
@@ -44,10 +59,10 @@ class QuestEndConfirmView(discord.ui.View):
                 return
 
             # Get quest details for summary
-            quest = await self.db.get_quest(self.quest_id)
-            participants = await self.db.get_quest_participants(self.quest_id)
-            dms = await self.db.get_quest_dms(self.quest_id)
-            monsters = await self.db.get_quest_monsters(self.quest_id)
+            quest = await self.db.get_quest_bundle(self.quest_id)
+            participants = quest['participants']
+            dms = quest['dms']
+            monsters = quest['monsters']
 
             # Build summary message
             from utils.quest_xp import calculate_quest_xp
@@ -88,11 +103,36 @@ class QuestEndConfirmView(discord.ui.View):
             else:
                 summary += f"⚠️ No monsters were added to this quest.\n"
 
+            if award_xp and award['awards']:
+                summary += f"\n**XP Awarded:** {award['xp_per_pc']:,} to each of {len(award['awards'])} PC(s)\n"
+                for a in award['awards']:
+                    if a['leveled_up']:
+                        summary += f"- 🎉 {a['name']} reached Level {a['new_level']}\n"
+
+                # Level-up posts and DMs go out from the notification workers as one batch
+                interaction.client.notifications.enqueue_many(
+                    LevelUpEvent(
+                        user_id=a['user_id'],
+                        character_name=a['name'],
+                        old_level=a['old_level'],
+                        new_level=a['new_level'],
+                        new_xp=a['new_xp'],
+                        source=f"Quest: {self.quest_name}",
+                        image_url=a['image_url'],
+                        character_sheet_url=a['character_sheet_url'],
+                        footer=f"Awarded by {interaction.user.display_name}"
+                    )
+                    for a in award['awards'] if a['leveled_up']
+                )
+            elif award_xp:
+                summary += f"\n⚠️ No XP was awarded (no participants or no monster XP).\n"
+
             summary += f"\n_Quest is now locked. No more changes can be made._"
 
             # Update the original message
             await interaction.response.edit_message(content=summary, view=None)
-            logger.info(f"Quest '{self.quest_name}' (ID: {self.quest_id}) completed by user {interaction.user.id}")
+            logger.info(f"Quest '{self.quest_name}' (ID: {self.quest_id}) completed by user {interaction.user.id}"
+                        + (" with XP awarded" if award_xp else ""))
 
         except Exception as e:
             logger.error(f"Error completing quest '{self.quest_name}': {e}")
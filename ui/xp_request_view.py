@@ -3,6 +3,7 @@ XP Request approval view for XP Bot
 """
 import discord
 import logging
+from utils.notifications import LevelUpEvent
 
 logger = logging.getLogger('xp-bot')
 
@@ -29,154 +30,49 @@ class XPRequestView(discord.ui.View):
             return
 
         # Grant the XP
-        xp_result = await self.db.award_xp(self.user_id, self.character_name, self.amount)
+        xp_result = await self.db.award_xp_by_id(self.character_id, self.amount)
+        if not xp_result:
+            await interaction.response.send_message("❌ Character no longer exists.", ephemeral=True)
+            return
 
         # Log the XP grant
         await self.db.log_xp_grant(self.character_id, interaction.user.id, self.amount, f"Approved request: {self.memo}")
 
-        # Get updated character info
+        # Updated character row comes back from the award itself
         from utils.xp import get_level_and_progress
-        updated_char = await self.db.get_character(self.user_id, self.character_name)
-        new_xp = updated_char['xp']
+        updated_char = xp_result['character']
+        # Current name, in case the character was renamed while the request was pending
+        char_name = updated_char['name']
+        new_xp = xp_result['new_xp']
         new_level, progress, required = get_level_and_progress(new_xp)
 
         # Check if character leveled up
         leveled_up = xp_result['leveled_up']
         old_level = xp_result['old_level']
 
-        # Send level-up notification if character leveled up
+        # Level-up post and DM go out from the notification workers
         if leveled_up:
-            # Get log channel for level-up notification
-            log_channel_id = await self.db.get_log_channel()
-            if log_channel_id:
-                log_channel = interaction.client.get_channel(log_channel_id)
-                if log_channel:
-                    from ui.character_view import DEFAULT_CHARACTER_IMAGE
-                    level_embed = discord.Embed(
-                        title=f"🎉 Level Up! - {self.character_name}",
-                        description=f"**{self.character_name}** has leveled up from **Level {old_level}** to **Level {new_level}**!",
-                        color=discord.Color.gold(),
-                        timestamp=discord.utils.utcnow()
-                    )
-
-                    level_embed.add_field(
-                        name="**Player**",
-                        value=f"<@{self.user_id}>",
-                        inline=True
-                    )
-
-                    level_embed.add_field(
-                        name="**Old Level**",
-                        value=str(old_level),
-                        inline=True
-                    )
-
-                    level_embed.add_field(
-                        name="**New Level**",
-                        value=str(new_level),
-                        inline=True
-                    )
-
-                    # Add character sheet link if available
-                    if updated_char.get('character_sheet_url'):
-                        level_embed.add_field(
-                            name="**Character Sheet**",
-                            value=f"[View Sheet]({updated_char['character_sheet_url']})",
-                            inline=False
-                        )
-
-                    level_embed.add_field(
-                        name="**Action Required**",
-                        value="Please update your character sheet to reflect your new level!",
-                        inline=False
-                    )
-
-                    # Add character image
-                    image_url = updated_char.get("image_url") or DEFAULT_CHARACTER_IMAGE
-                    level_embed.set_thumbnail(url=image_url)
-
-                    level_embed.set_footer(text=f"Request approved by {interaction.user.display_name}")
-
-                    try:
-                        await log_channel.send(embed=level_embed)
-                    except Exception as e:
-                        logger.error(f"Failed to post level-up notification: {e}")
-
-            # Send DM to character owner
-            try:
-                owner = await interaction.client.fetch_user(self.user_id)
-
-                # Create rich embed for level-up DM
-                from ui.character_view import DEFAULT_CHARACTER_IMAGE
-                levelup_dm_embed = discord.Embed(
-                    title=f"🎉 Level Up! - {self.character_name}",
-                    description=f"**{self.character_name}** has leveled up from **Level {old_level}** to **Level {new_level}**!",
-                    color=discord.Color.gold(),
-                    timestamp=discord.utils.utcnow()
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**Player**",
-                    value=f"<@{self.user_id}>",
-                    inline=False
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**Old Level**",
-                    value=str(old_level),
-                    inline=True
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**New Level**",
-                    value=str(new_level),
-                    inline=True
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**New Total XP**",
-                    value=f"{new_xp:,}",
-                    inline=False
-                )
-
-                levelup_dm_embed.add_field(
-                    name="**Reason**",
-                    value=f"{self.memo}",
-                    inline=False
-                )
-
-                if updated_char.get('character_sheet_url'):
-                    levelup_dm_embed.add_field(
-                        name="**Action Required**",
-                        value=f"Please update your [character sheet]({updated_char['character_sheet_url']}) to reflect your new level!",
-                        inline=False
-                    )
-                else:
-                    levelup_dm_embed.add_field(
-                        name="**Action Required**",
-                        value="Please update your character sheet to reflect your new level!",
-                        inline=False
-                    )
-
-                # Add character image
-                image_url = updated_char.get("image_url") or DEFAULT_CHARACTER_IMAGE
-                levelup_dm_embed.set_thumbnail(url=image_url)
-
-                levelup_dm_embed.set_footer(text=f"Approved by {interaction.user.display_name}")
-
-                await owner.send(embed=levelup_dm_embed)
-            except Exception as e:
-                logger.warning(f"Could not send level-up DM to user {self.user_id}: {e}")
+            interaction.client.notifications.enqueue(LevelUpEvent(
+                user_id=self.user_id,
+                character_name=char_name,
+                old_level=old_level,
+                new_level=new_level,
+                new_xp=new_xp,
+                reason=self.memo,
+                image_url=updated_char.get('image_url'),
+                character_sheet_url=updated_char.get('character_sheet_url'),
+                footer=f"Approved by {interaction.user.display_name}"
+            ))
 
         # Send XP grant notification to character owner (always sent, in addition to level-up if applicable)
         # This applies to both manual requests and auto-generated requests
         try:
-            owner = await interaction.client.fetch_user(self.user_id)
+            owner = await interaction.client.user_resolver.resolve(self.user_id)
 
             # Create DM embed matching the log channel format
             from ui.character_view import DEFAULT_CHARACTER_IMAGE
             dm_embed = discord.Embed(
-                title=f"XP Granted - {self.character_name}",
+                title=f"XP Granted - {char_name}",
                 color=discord.Color.green(),
                 timestamp=discord.utils.utcnow()
             )
@@ -266,7 +162,7 @@ class XPRequestView(discord.ui.View):
         # Post a notification to the channel about the approval
         from ui.character_view import DEFAULT_CHARACTER_IMAGE
         notification_embed = discord.Embed(
-            title=f"XP Granted - {self.character_name}",
+            title=f"XP Granted - {char_name}",
             color=discord.Color.green(),
             timestamp=discord.utils.utcnow()
         )
@@ -326,9 +222,9 @@ class XPRequestView(discord.ui.View):
         # Character owner already received a notification above
         if self.requester_id != self.user_id:
             try:
-                requester = await interaction.client.fetch_user(self.requester_id)
+                requester = await interaction.client.user_resolver.resolve(self.requester_id)
                 await requester.send(
-                    f"✅ Your XP request for **{self.character_name}** has been approved!\n"
+                    f"✅ Your XP request for **{char_name}** has been approved!\n"
                     f"Amount: {self.amount:,} XP\n"
                     f"New Total XP: {new_xp:,}\n"
                     f"New Level: {new_level}\n"
@@ -358,7 +254,7 @@ class XPRequestView(discord.ui.View):
 
         # Notify the requester
         try:
-            requester = await interaction.client.fetch_user(self.requester_id)
+            requester = await interaction.client.user_resolver.resolve(self.requester_id)
             await requester.send(
                 f"❌ Your XP request for **{self.character_name}** has been denied.\n"
                 f"Amount: {self.amount} XP\n"
@@ -0,0 +1,228 @@
+"""
+Write-behind accumulator for RP character buffers
+"""
+import os
+import time
+import asyncio
+import logging
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+from utils.xp import get_local_date
+
+logger = logging.getLogger('xp-bot')
+
+# Seconds between background flushes of dirty buffers
+FLUSH_INTERVAL = float(os.getenv("CHAR_BUFFER_FLUSH_INTERVAL", 30))
+
+
+class CharBufferAccumulator:
+    """
+    Keeps buffer-only RP progress in memory and writes it back in batches.
+
+    Most RP messages only grow the active character's char_buffer. Once a user has
+    gone through the synchronous path once, their active character's buffer, daily XP
+    and local date are kept as a snapshot; messages that won't award XP only update
+    the snapshot and a per-character delta. Messages that would award XP (or arrive
+    after the user's day has rolled over) go to Database.process_rp_message() with any
+    pending delta folded into the character count.
+
+    Deltas are kept per local day and only written to rows whose cap_day is still that
+    day, so a delta that outlives its snapshot (invalidation, day rollover, daily reset)
+    can't leak into another day's counters.
+    """
+
+    def __init__(self, db, flush_interval: float = FLUSH_INTERVAL):
+        self.db = db
+        self.flush_interval = flush_interval
+        # user_id -> {character_id, char_buffer, daily_xp, local_date, timezone}
+        self._snapshots: Dict[int, Dict] = {}
+        # (character_id, local_date) -> chars not yet written to characters.char_buffer (may be negative)
+        self._dirty: Dict[Tuple[int, date], int] = {}
+        # user_id -> character_id whose deltas were left queued when the user's snapshot was dropped
+        self._detached: Dict[int, int] = {}
+        self._flush_lock = asyncio.Lock()
+        # Bumped on every invalidation so in-flight calls don't install stale snapshots
+        self._epoch = 0
+
+        # Metrics
+        self.buffered_messages = 0
+        self.sync_messages = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_flush_at: Optional[float] = None
+        self.last_flush_gap: Optional[float] = None
+        self.last_flush_latency: Optional[float] = None
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def try_buffer(self, user_id: int, char_count: int, char_per_rp: int, daily_cap: int) -> bool:
+        """Apply a message in memory if it can't award XP, returns False if it needs the database"""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None:
+            return False
+
+        if get_local_date(snapshot['timezone']) != snapshot['local_date']:
+            # Day rolled over: counters with an earlier cap_day count as zero anyway
+            self._snapshots.pop(user_id, None)
+            self._dirty.pop((snapshot['character_id'], snapshot['local_date']), None)
+            return False
+
+        total = snapshot['char_buffer'] + char_count
+        if min(total // char_per_rp, daily_cap - snapshot['daily_xp']) > 0:
+            return False
+
+        new_buffer = total % char_per_rp
+        delta = new_buffer - snapshot['char_buffer']
+        snapshot['char_buffer'] = new_buffer
+        if delta:
+            key = (snapshot['character_id'], snapshot['local_date'])
+            self._dirty[key] = self._dirty.get(key, 0) + delta
+        self.buffered_messages += 1
+        return True
+
+    async def begin_sync(self, user_id: int) -> Dict:
+        """Prepare a database call for a user: takes their pending delta and picks the local date
+        Returns a ticket for end_sync()/abort_sync(); add ticket['pending'] to the character count"""
+        # A flush in flight hasn't reached char_buffer yet - wait so the function sees it
+        if self._flush_lock.locked():
+            async with self._flush_lock:
+                pass
+
+        # Messages arriving while this call is in flight also take the synchronous path
+        snapshot = self._snapshots.pop(user_id, None)
+        if snapshot:
+            local_date = snapshot['local_date']
+        else:
+            # Deltas queued before an invalidation must reach the row before the function reads it
+            character_id = self._detached.pop(user_id, None)
+            if character_id is not None:
+                try:
+                    await self.flush([character_id])
+                except Exception as e:
+                    logger.warning(f"Failed to flush buffered RP for user {user_id} before syncing: {e}")
+            # Cached profile timezone when known; otherwise the database derives the date
+            timezone = self.db.peek_user_timezone(user_id)
+            local_date = get_local_date(timezone) if timezone else None
+
+        return {
+            'epoch': self._epoch,
+            'character_id': snapshot['character_id'] if snapshot else None,
+            'pending': self._dirty.pop((snapshot['character_id'], local_date), 0) if snapshot else 0,
+            'local_date': local_date
+        }
+
+    def end_sync(self, user_id: int, ticket: Dict, result: Optional[Dict]):
+        """Install a fresh snapshot from a process_rp_message() result"""
+        self.sync_messages += 1
+        if not result or ticket['epoch'] != self._epoch:
+            return
+
+        character_id = result['character_id']
+        self._snapshots[user_id] = {
+            'character_id': character_id,
+            'char_buffer': result['char_buffer'],
+            'daily_xp': result['daily_xp'],
+            'local_date': result['local_date'],
+            'timezone': result['timezone']
+        }
+
+    def abort_sync(self, ticket: Dict):
+        """Put back the pending delta of a database call that failed"""
+        if ticket['pending']:
+            key = (ticket['character_id'], ticket['local_date'])
+            self._dirty[key] = self._dirty.get(key, 0) + ticket['pending']
+
+    async def process_message(self, user_id: int, char_count: int,
+                              char_per_rp: int, daily_cap: int) -> Optional[Dict]:
+        """Apply one RP message, in memory when possible
+        Returns the Database.process_rp_message() result when the synchronous path ran,
+        None when the message was buffered or the user has no active character"""
+        if self.try_buffer(user_id, char_count, char_per_rp, daily_cap):
+            return None
+
+        ticket = await self.begin_sync(user_id)
+        return await self.run_sync(user_id, ticket, char_count, char_per_rp, daily_cap)
+
+    async def run_sync(self, user_id: int, ticket: Dict, char_count: int,
+                       char_per_rp: int, daily_cap: int) -> Optional[Dict]:
+        """Call Database.process_rp_message() for a begin_sync() ticket with its pending delta
+        folded in, then install the new snapshot (or put the delta back on failure)"""
+        try:
+            result = await self.db.process_rp_message(
+                user_id, char_count + ticket['pending'], ticket['local_date'], char_per_rp, daily_cap
+            )
+        except BaseException:
+            self.abort_sync(ticket)
+            raise
+
+        self.end_sync(user_id, ticket, result)
+        return result
+
+    def invalidate(self, user_id: int):
+        """Forget a user's snapshot (active character, timezone or counters changed)
+        Pending deltas stay queued; the user's next sync writes them first."""
+        snapshot = self._snapshots.pop(user_id, None)
+        if snapshot:
+            self._detached[user_id] = snapshot['character_id']
+        self._epoch += 1
+
+    def discard(self, character_ids: Iterable[int], before: date):
+        """Drop pending deltas accrued before a local date (their counters were reset)"""
+        character_ids = set(character_ids)
+        for key in [key for key in self._dirty if key[0] in character_ids and key[1] < before]:
+            del self._dirty[key]
+
+    async def flush(self, character_ids: Optional[Iterable[int]] = None) -> int:
+        """Write dirty buffers back in one statement (all of them, or just character_ids)
+        Returns the number of rows sent"""
+        async with self._flush_lock:
+            if character_ids is None:
+                batch = {key: delta for key, delta in self._dirty.items() if delta}
+                self._dirty = {}
+            else:
+                character_ids = set(character_ids)
+                keys = [key for key in self._dirty if key[0] in character_ids]
+                batch = {key: self._dirty.pop(key) for key in keys}
+                batch = {key: delta for key, delta in batch.items() if delta}
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                await self.db.flush_char_buffers(
+                    [cid for cid, _ in batch], list(batch.values()), [local_date for _, local_date in batch]
+                )
+            except BaseException:
+                # Keep the deltas for the next attempt
+                for key, delta in batch.items():
+                    self._dirty[key] = self._dirty.get(key, 0) + delta
+                raise
+
+            latency = time.perf_counter() - start
+            now = time.monotonic()
+            if self.last_flush_at is not None:
+                self.last_flush_gap = now - self.last_flush_at
+            self.last_flush_at = now
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self.total_flush_latency += latency
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            logger.debug(f"Flushed {len(batch)} character buffers in {latency * 1000:.1f}ms")
+            return len(batch)
+
+    def stats(self) -> Dict:
+        """Return accumulator metrics"""
+        return {
+            'flush_interval': self.flush_interval,
+            'last_flush_gap': self.last_flush_gap,
+            'dirty': sum(1 for delta in self._dirty.values() if delta),
+            'snapshots': len(self._snapshots),
+            'buffered_messages': self.buffered_messages,
+            'sync_messages': self.sync_messages,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'last_flush_latency': self.last_flush_latency,
+            'avg_flush_latency': (self.total_flush_latency / self.flushes) if self.flushes else None,
+            'max_flush_latency': self.max_flush_latency
+        }
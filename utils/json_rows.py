@@ -0,0 +1,19 @@
+"""
+Decoding of json_agg columns for XP Bot and the dashboard
+"""
+import json
+from datetime import datetime
+from typing import Dict, List
+
+# Timestamp columns of quest child rows returned through json_agg
+JSON_TIMESTAMP_FIELDS = ('joined_at', 'added_at')
+
+
+def decode_json_rows(value: str) -> List[Dict]:
+    """Decode a json_agg column into row dicts, restoring timestamp columns to datetimes"""
+    rows = json.loads(value)
+    for row in rows:
+        for key in JSON_TIMESTAMP_FIELDS:
+            if row.get(key):
+                row[key] = datetime.fromisoformat(row[key])
+    return rows
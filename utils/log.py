@@ -0,0 +1,92 @@
+"""
+Logging setup for XP Bot - queue-based handlers, hot-path sampling and optional JSON output
+"""
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+# Logger for per-message records; rate limited by configure_logging()
+HOT_PATH_LOGGER = 'xp-bot.hotpath'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, LOG_DATEFMT),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records through per `interval` seconds and drops the rest.
+
+    Filters run before any handler, so suppressed records are never formatted or queued.
+    The first record of each new window reports how many were suppressed.
+    """
+
+    def __init__(self, burst: int = 20, interval: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._window_start = 0.0
+        self._count = 0
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+        if now - self._window_start >= self.interval:
+            if self.suppressed:
+                record.msg = f"{record.msg} [{self.suppressed} similar records suppressed]"
+            self._window_start = now
+            self._count = 0
+            self.suppressed = 0
+
+        self._count += 1
+        if self._count > self.burst:
+            self.suppressed += 1
+            return False
+        return True
+
+
+def configure_logging(level: int, json_format: bool = False,
+                      hot_path_burst: int = 20, hot_path_interval: float = 10.0) -> logging.handlers.QueueListener:
+    """Route all logging through a QueueHandler so stream I/O happens on a listener thread
+    Returns the started listener (stopped automatically at exit)"""
+    formatter: logging.Formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    logging.getLogger(HOT_PATH_LOGGER).addFilter(RateLimitFilter(hot_path_burst, hot_path_interval))
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def get_hot_path_logger() -> logging.Logger:
+    """Logger for per-message records (use %-style arguments so formatting stays lazy)"""
+    return logging.getLogger(HOT_PATH_LOGGER)
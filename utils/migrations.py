@@ -0,0 +1,130 @@
+"""
+Versioned schema migrations for XP Bot
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Tuple
+import asyncpg
+
+logger = logging.getLogger('xp-bot.database')
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+# Files must be named NNNN_description.sql; they run in numeric order
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+# Arbitrary key shared by every bot/dashboard process that might migrate ("xp_bot")
+MIGRATION_LOCK_ID = 0x78705f626f74
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMP DEFAULT NOW()
+    )
+"""
+
+
+@dataclass
+class Migration:
+    """One migration file"""
+    version: int
+    name: str
+    sql: str
+    checksum: str
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Read every migration file in version order"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), 'r') as f:
+            sql = f.read()
+        migrations.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            sql=sql,
+            checksum=hashlib.sha256(sql.encode()).hexdigest()
+        ))
+
+    migrations.sort(key=lambda m: m.version)
+    for previous, current in zip(migrations, migrations[1:]):
+        if previous.version == current.version:
+            raise ValueError(f"Duplicate migration version {current.version}: {previous.name}, {current.name}")
+    return migrations
+
+
+async def _schema_state(conn: asyncpg.Connection) -> Tuple[Dict[int, str], FrozenSet[str]]:
+    """(version -> checksum of applied migrations, installed extensions) in one query
+    Applied versions are empty if the table doesn't exist yet."""
+    try:
+        row = await conn.fetchrow("""
+            SELECT array_agg(version ORDER BY version) AS versions, array_agg(checksum ORDER BY version) AS checksums,
+                   (SELECT array_agg(extname::text) FROM pg_extension) AS extensions
+            FROM schema_migrations
+        """)
+    except asyncpg.UndefinedTableError:
+        extensions = await conn.fetchval("SELECT array_agg(extname::text) FROM pg_extension")
+        return {}, frozenset(extensions or ())
+    applied = dict(zip(row['versions'] or (), row['checksums'] or ()))
+    return applied, frozenset(row['extensions'] or ())
+
+
+def _check_checksums(migrations: List[Migration], applied: Dict[int, str]):
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is not None and checksum != migration.checksum:
+            logger.warning(
+                f"Migration {migration.version:04d}_{migration.name} changed after it was applied; "
+                f"edits to applied migrations are not re-run - add a new migration instead"
+            )
+
+
+async def migrate(pool: asyncpg.Pool, migrations: List[Migration] = None) -> Tuple[int, FrozenSet[str]]:
+    """Apply pending migrations, returning how many ran and the installed extensions
+    (optional features such as pg_trgm depend on what the migrations could install).
+    An up-to-date database costs one query and takes no locks. Otherwise the runner holds a
+    session advisory lock so concurrent processes apply each migration exactly once, and every
+    migration commits together with its schema_migrations row."""
+    if migrations is None:
+        migrations = load_migrations()
+
+    async with pool.acquire() as conn:
+        applied, extensions = await _schema_state(conn)
+        if all(m.version in applied for m in migrations):
+            _check_checksums(migrations, applied)
+            logger.debug(f"Schema is current ({len(applied)} migrations applied)")
+            return 0, extensions
+
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        try:
+            await conn.execute(CREATE_MIGRATIONS_TABLE)
+            # Another process may have finished while we waited for the lock
+            applied, _ = await _schema_state(conn)
+            _check_checksums(migrations, applied)
+
+            count = 0
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                start = time.perf_counter()
+                async with conn.transaction():
+                    await conn.execute(migration.sql)
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)",
+                        migration.version, migration.name, migration.checksum
+                    )
+                elapsed = time.perf_counter() - start
+                logger.info(f"Applied migration {migration.version:04d}_{migration.name} in {elapsed * 1000:.1f}ms")
+                count += 1
+
+            _, extensions = await _schema_state(conn)
+            return count, extensions
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
@@ -0,0 +1,148 @@
+"""
+In-memory character name index for XP Bot autocompletes
+"""
+import bisect
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+# Seconds between full reloads, to pick up writes made by other processes (dashboard, replicas)
+REFRESH_INTERVAL = 600
+
+
+@dataclass
+class NameEntry:
+    """One character in the index"""
+    id: int
+    user_id: int
+    name: str
+    retired: bool
+
+
+class CharacterNameIndex:
+    """
+    Every character's name, owner and retired flag, kept in a list sorted by casefolded name.
+
+    Prefix matches are a bisect; substring matches scan the (small) sorted list. Recency
+    for empty searches is the order characters were loaded (by updated_at) or last changed.
+    Database mutations keep it current; Database.load_character_names() rebuilds it.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[int, NameEntry] = {}
+        # (casefolded name, id), sorted
+        self._keys: List[Tuple[str, int]] = []
+        # id -> None in least to most recently changed order
+        self._recent: Dict[int, None] = {}
+        self.loaded = False
+
+        # Metrics
+        self.searches = 0
+        self.lookups = 0
+        self.reloads = 0
+
+    def load(self, rows: Iterable):
+        """Replace the index with rows of (id, user_id, name, retired), oldest update first"""
+        by_id = {}
+        recent = {}
+        for row in rows:
+            by_id[row['id']] = NameEntry(row['id'], row['user_id'], row['name'], row['retired'])
+            recent[row['id']] = None
+        self._by_id = by_id
+        self._recent = recent
+        self._keys = sorted((entry.name.casefold(), entry.id) for entry in by_id.values())
+        self.loaded = True
+        self.reloads += 1
+
+    def upsert(self, character_id: int, user_id: int, name: str, retired: bool = False):
+        """Add a character or update its name/flags"""
+        entry = self._by_id.get(character_id)
+        if entry is not None and entry.name != name:
+            self._remove_key(entry)
+        if entry is None or entry.name != name:
+            bisect.insort(self._keys, (name.casefold(), character_id))
+        self._by_id[character_id] = NameEntry(character_id, user_id, name, retired)
+        self._recent.pop(character_id, None)
+        self._recent[character_id] = None
+
+    def set_retired(self, character_id: int, retired: bool):
+        entry = self._by_id.get(character_id)
+        if entry is not None:
+            self.upsert(character_id, entry.user_id, entry.name, retired)
+
+    def remove(self, character_id: int):
+        entry = self._by_id.pop(character_id, None)
+        if entry is not None:
+            self._remove_key(entry)
+            self._recent.pop(character_id, None)
+
+    def remove_user(self, user_id: int):
+        """Drop every character a user owns"""
+        for entry in [e for e in self._by_id.values() if e.user_id == user_id]:
+            self.remove(entry.id)
+
+    def _remove_key(self, entry: NameEntry):
+        key = (entry.name.casefold(), entry.id)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def search(self, text: str, limit: int = 25, include_retired: bool = False) -> List[str]:
+        """Distinct names containing text (case-insensitive): prefix matches first, then other
+        substring matches, each alphabetical. Empty text returns the most recently changed names."""
+        self.searches += 1
+        names: List[str] = []
+        seen = set()
+
+        def take(character_id: int) -> bool:
+            entry = self._by_id[character_id]
+            if (include_retired or not entry.retired) and entry.name not in seen:
+                seen.add(entry.name)
+                names.append(entry.name)
+            return len(names) >= limit
+
+        if not text:
+            for character_id in reversed(self._recent):
+                if take(character_id):
+                    break
+            return names
+
+        needle = text.casefold()
+        start = bisect.bisect_left(self._keys, (needle,))
+        end = start
+        while end < len(self._keys) and self._keys[end][0].startswith(needle):
+            if take(self._keys[end][1]):
+                return names
+            end += 1
+
+        for i, (key, character_id) in enumerate(self._keys):
+            if start <= i < end:
+                continue
+            if needle in key and take(character_id):
+                break
+        return names
+
+    def find_exact(self, name: str, include_retired: bool = False) -> List[NameEntry]:
+        """Characters whose name is exactly `name` (case-sensitive, like name = $1)"""
+        self.lookups += 1
+        key = name.casefold()
+        matches = []
+        i = bisect.bisect_left(self._keys, (key,))
+        while i < len(self._keys) and self._keys[i][0] == key:
+            entry = self._by_id[self._keys[i][1]]
+            if entry.name == name and (include_retired or not entry.retired):
+                matches.append(entry)
+            i += 1
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def stats(self) -> Dict:
+        """Return index metrics"""
+        return {
+            'size': len(self._by_id),
+            'loaded': self.loaded,
+            'searches': self.searches,
+            'lookups': self.lookups,
+            'reloads': self.reloads
+        }
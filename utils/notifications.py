@@ -0,0 +1,223 @@
+"""
+Asynchronous level-up notification dispatcher for XP Bot
+"""
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+import discord
+
+logger = logging.getLogger('xp-bot')
+
+# Queue and worker sizing
+QUEUE_SIZE = 1000
+WORKER_COUNT = 2
+# Retries for rate limits (429) and Discord server errors (5xx)
+MAX_SEND_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0
+
+
+@dataclass
+class LevelUpEvent:
+    """A character crossed a level threshold"""
+    user_id: int
+    character_name: str
+    old_level: int
+    new_level: int
+    new_xp: int
+    source: Optional[str] = None            # e.g. "Roleplay Activity"
+    reason: Optional[str] = None            # memo shown to the player
+    image_url: Optional[str] = None
+    character_sheet_url: Optional[str] = None
+    channel_id: Optional[int] = None        # channel post target, None for the log channel
+    post_to_channel: bool = True
+    send_dm: bool = True
+    footer: Optional[str] = None
+
+
+def build_level_up_embed(event: LevelUpEvent, for_dm: bool) -> discord.Embed:
+    """Shared level-up embed for log channel posts and owner DMs"""
+    from ui.character_view import DEFAULT_CHARACTER_IMAGE
+
+    embed = discord.Embed(
+        title=f"🎉 Level Up! - {event.character_name}",
+        description=f"**{event.character_name}** has leveled up from **Level {event.old_level}** to **Level {event.new_level}**!",
+        color=discord.Color.gold(),
+        timestamp=discord.utils.utcnow()
+    )
+
+    embed.add_field(name="**Player**", value=f"<@{event.user_id}>", inline=not for_dm)
+    embed.add_field(name="**Old Level**", value=str(event.old_level), inline=True)
+    embed.add_field(name="**New Level**", value=str(event.new_level), inline=True)
+
+    if for_dm:
+        embed.add_field(name="**New Total XP**", value=f"{event.new_xp:,}", inline=False)
+
+    if event.source:
+        embed.add_field(name="**Source**", value=event.source, inline=False)
+
+    if event.reason:
+        embed.add_field(name="**Reason**", value=event.reason, inline=False)
+
+    if event.character_sheet_url and for_dm:
+        embed.add_field(
+            name="**Action Required**",
+            value=f"Please update your [character sheet]({event.character_sheet_url}) to reflect your new level!",
+            inline=False
+        )
+    else:
+        if event.character_sheet_url:
+            embed.add_field(
+                name="**Character Sheet**",
+                value=f"[View Sheet]({event.character_sheet_url})",
+                inline=False
+            )
+        embed.add_field(
+            name="**Action Required**",
+            value="Please update your character sheet to reflect your new level!",
+            inline=False
+        )
+
+    embed.set_thumbnail(url=event.image_url or DEFAULT_CHARACTER_IMAGE)
+
+    if event.footer:
+        embed.set_footer(text=event.footer)
+
+    return embed
+
+
+class NotificationService:
+    """
+    Queue of level-up events drained by background workers.
+
+    Callers enqueue and return immediately; workers render the shared embed, post to the
+    log channel and DM the owner, retrying rate limits and server errors with backoff.
+    """
+
+    def __init__(self, bot, db, workers: int = WORKER_COUNT, queue_size: int = QUEUE_SIZE):
+        self.bot = bot
+        self.db = db
+        self.worker_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = []
+
+        # Metrics
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.last_send_latency: Optional[float] = None
+        self.max_send_latency = 0.0
+        self.total_send_latency = 0.0
+
+    def start(self):
+        """Start the worker tasks (idempotent)"""
+        self._workers = [task for task in self._workers if not task.done()]
+        while len(self._workers) < self.worker_count:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued notifications a chance to go out, then stop the workers"""
+        if self._workers and not self.queue.empty():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping {self.queue.qsize()} queued notifications on shutdown")
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+
+    def enqueue(self, event: LevelUpEvent) -> bool:
+        """Queue an event without waiting, returns False if the queue is full"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Notification queue full, dropped level-up for '{event.character_name}'")
+            return False
+        self.enqueued += 1
+        return True
+
+    def enqueue_many(self, events: Iterable[LevelUpEvent]) -> int:
+        """Queue a batch of events (e.g. every level-up from one quest), returns how many fit"""
+        return sum(1 for event in events if self.enqueue(event))
+
+    async def _worker(self):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self._dispatch(event)
+            except Exception as e:
+                logger.error(f"Unexpected error dispatching level-up for '{event.character_name}': {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _dispatch(self, event: LevelUpEvent):
+        if event.post_to_channel:
+            try:
+                channel_id = event.channel_id or await self.db.get_log_channel()
+                channel = self.bot.get_channel(channel_id) if channel_id else None
+                if channel:
+                    embed = build_level_up_embed(event, for_dm=False)
+                    await self._send(lambda: channel.send(embed=embed))
+                    logger.info(f"Posted level-up notification for {event.character_name} to log channel")
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to post level-up notification for {event.character_name}: {e}")
+
+        if event.send_dm:
+            embed = build_level_up_embed(event, for_dm=True)
+
+            async def send_dm():
+                owner = await self.bot.user_resolver.resolve(event.user_id)
+                await owner.send(embed=embed)
+
+            try:
+                await self._send(send_dm)
+                logger.info(f"Sent level-up DM to user {event.user_id}")
+            except discord.Forbidden:
+                self.failed += 1
+                logger.warning(f"Could not send level-up DM to user {event.user_id} - DMs may be disabled")
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Could not send level-up DM to user {event.user_id}: {e}")
+
+    async def _send(self, send):
+        """Run one send, retrying 429/5xx responses with exponential backoff"""
+        delay = RETRY_BASE_DELAY
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            start = time.perf_counter()
+            try:
+                await send()
+            except discord.HTTPException as e:
+                if (e.status == 429 or e.status >= 500) and attempt < MAX_SEND_ATTEMPTS:
+                    self.retries += 1
+                    logger.warning(f"Discord returned {e.status}, retrying notification in {delay:.1f}s (attempt {attempt}/{MAX_SEND_ATTEMPTS})")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                    continue
+                raise
+
+            latency = time.perf_counter() - start
+            self.sent += 1
+            self.last_send_latency = latency
+            self.max_send_latency = max(self.max_send_latency, latency)
+            self.total_send_latency += latency
+            return
+
+    def stats(self) -> Dict:
+        """Return dispatcher metrics"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'workers': len([task for task in self._workers if not task.done()]),
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'retries': self.retries,
+            'last_send_latency': self.last_send_latency,
+            'avg_send_latency': (self.total_send_latency / self.sent) if self.sent else None,
+            'max_send_latency': self.max_send_latency
+        }
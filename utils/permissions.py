@@ -1,8 +1,42 @@
 """
 Permission checking utilities for XP Bot
 """
+from typing import FrozenSet
 
 
 def has_role(user, allowed_roles):
     """Return True if user has at least one allowed role name."""
     return any(role.name in allowed_roles for role in getattr(user, 'roles', []))
+
+
+class PermissionService:
+    """
+    Role-based permission checks shared by the admin, character and quest commands.
+
+    The allowed role set comes from the cached guild config (a frozenset, dropped whenever
+    the config is written), so checks never query the database once it's warm. Decisions
+    are memoized in interaction.extras for the life of the interaction.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def character_creation_roles(self, guild_id: int) -> FrozenSet[int]:
+        """Role IDs allowed to create characters, grant XP and run quests"""
+        return await self.db.get_character_creation_role_set(guild_id)
+
+    async def can_manage_characters(self, interaction, guild_id: int, allow_if_unconfigured: bool = True) -> bool:
+        """Admin, or holds a character creation role
+        With no roles configured everyone passes, unless allow_if_unconfigured is False"""
+        if interaction.user.guild_permissions.administrator:
+            return True
+
+        allowed = await self.character_creation_roles(guild_id)
+        key = ('can_manage_characters', allowed, allow_if_unconfigured)
+        decisions = interaction.extras.setdefault('permissions', {})
+        if key not in decisions:
+            if not allowed:
+                decisions[key] = allow_if_unconfigured
+            else:
+                decisions[key] = not allowed.isdisjoint(role.id for role in getattr(interaction.user, 'roles', ()))
+        return decisions[key]
@@ -0,0 +1,51 @@
+"""
+Frozen summaries of completed quests
+"""
+from typing import Dict
+from utils.quest_xp import calculate_quest_xp, calculate_xp_per_participant
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def build_quest_snapshot(quest: Dict) -> Dict:
+    """
+    Build the JSON-serializable snapshot of a quest bundle (see Database.get_quest_bundle)
+
+    Contains participants with their starting level/XP, DMs with their resolved names,
+    the monster breakdown from calculate_quest_xp, and total and per-PC XP.
+    """
+    quest_xp_data = calculate_quest_xp(quest['monsters'])
+    participants = quest['participants']
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'participants': [
+            {
+                'character_id': p['character_id'],
+                'character_name': p['character_name'],
+                'user_id': p['user_id'],
+                'starting_level': p['starting_level'],
+                'starting_xp': p['starting_xp'],
+                'joined_at': _isoformat(p['joined_at'])
+            }
+            for p in participants
+        ],
+        'dms': [
+            {
+                'user_id': dm['user_id'],
+                'name': dm['display_name'],
+                'is_primary': dm['is_primary'],
+                'joined_at': _isoformat(dm['joined_at'])
+            }
+            for dm in quest['dms']
+        ],
+        'monsters': quest_xp_data['breakdown'],
+        'monster_count': quest_xp_data['monster_count'],
+        'total_xp': quest_xp_data['total_xp'],
+        'xp_per_pc': calculate_xp_per_participant(quest_xp_data['total_xp'], len(participants))
+    }
@@ -0,0 +1,267 @@
+"""
+Micro-batched RP message ingest pipeline for XP Bot
+"""
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from utils.notifications import LevelUpEvent
+
+logger = logging.getLogger('xp-bot')
+
+# Bounded queue between on_message and the batch consumer
+QUEUE_SIZE = int(os.getenv("RP_QUEUE_SIZE", 5000))
+# A batch closes when it holds this many messages or the window has elapsed
+BATCH_MAX_SIZE = 200
+BATCH_WINDOW = 0.25
+# What happens when the queue is full:
+#   merge - fold the message into a per-user overflow entry (no RP lost, memory bounded by active users)
+#   drop  - discard the message and count it
+OVERFLOW_POLICY = os.getenv("RP_QUEUE_OVERFLOW", "merge")
+
+
+@dataclass
+class RPMessage:
+    """One tracked RP message (or several merged ones from the same user)"""
+    user_id: int
+    channel_id: int
+    char_count: int
+    message_id: int
+    char_per_rp: int
+    daily_cap: int
+    received_at: float = field(default_factory=time.monotonic)
+    merged: int = 1
+
+
+class RPIngestPipeline:
+    """
+    Bounded queue of RP messages drained by a single consumer in time/size windows.
+
+    Each batch is merged per user (the buffer math is additive, so summing character
+    counts is exact). Users whose merged messages can't award XP are applied in memory
+    by the char_buffer accumulator; the rest go to the database as one array-parameterized
+    statement in a single transaction. With a single consumer a user's updates never race
+    each other, and RP uses at most one pool connection however busy the channels get.
+    """
+
+    def __init__(self, db, notifications, queue_size: int = QUEUE_SIZE,
+                 batch_size: int = BATCH_MAX_SIZE, window: float = BATCH_WINDOW,
+                 overflow_policy: str = OVERFLOW_POLICY):
+        if overflow_policy not in ('merge', 'drop'):
+            raise ValueError(f"Unknown RP queue overflow policy: {overflow_policy}")
+
+        self.db = db
+        self.char_buffers = db.char_buffers
+        self.notifications = notifications
+        self.batch_size = batch_size
+        self.window = window
+        self.overflow_policy = overflow_policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # user_id -> merged message that arrived while the queue was full
+        self._overflow: Dict[int, RPMessage] = {}
+        self._consumer: Optional[asyncio.Task] = None
+        # True from the moment a batch takes its first message until it is applied
+        self._busy = False
+
+        # Metrics
+        self.submitted = 0
+        self.overflowed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.total_batch_messages = 0
+        self.db_rows = 0
+        self.last_lag: Optional[float] = None
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.lag_samples = 0
+
+    def submit(self, message: RPMessage) -> bool:
+        """Queue a message without waiting, applying the overflow policy when full
+        Returns False if the message was dropped"""
+        self.submitted += 1
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow_policy == 'drop':
+            self.dropped += 1
+            logger.warning(f"RP queue full, dropped message {message.message_id} from user {message.user_id}")
+            return False
+
+        self.overflowed += 1
+        existing = self._overflow.get(message.user_id)
+        if existing is None:
+            self._overflow[message.user_id] = message
+        else:
+            existing.char_count += message.char_count
+            existing.merged += message.merged
+            existing.char_per_rp = message.char_per_rp
+            existing.daily_cap = message.daily_cap
+        return True
+
+    def start(self):
+        """Start the consumer task (idempotent)"""
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self, timeout: float = 10.0):
+        """Apply everything still queued, then stop the consumer"""
+        deadline = time.monotonic() + timeout
+        while (not self.queue.empty() or self._overflow or self._busy) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if not self.queue.empty() or self._overflow:
+            logger.warning(f"Stopping RP pipeline with {self.queue.qsize() + len(self._overflow)} entries unapplied")
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+    async def _consume(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._apply(batch)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Unexpected error applying RP batch of {len(batch)} messages: {e}")
+            finally:
+                self._busy = False
+
+    async def _collect(self) -> List[RPMessage]:
+        """Wait for the first message, then gather until the batch is full or the window closes"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        if not self._overflow:
+            batch.append(await self.queue.get())
+        self._busy = True
+
+        deadline = loop.time() + self.window
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Overflow entries are newer than anything already queued for the same user
+        batch.extend(self._overflow.values())
+        self._overflow.clear()
+        return batch
+
+    async def _apply(self, batch: List[RPMessage]):
+        merged: Dict[int, RPMessage] = {}
+        message_count = 0
+        for message in batch:
+            message_count += message.merged
+            entry = merged.get(message.user_id)
+            if entry is None:
+                merged[message.user_id] = RPMessage(
+                    message.user_id, message.channel_id, message.char_count, message.message_id,
+                    message.char_per_rp, message.daily_cap, message.received_at, message.merged
+                )
+            else:
+                entry.char_count += message.char_count
+                entry.merged += message.merged
+                entry.message_id = message.message_id
+                entry.char_per_rp = message.char_per_rp
+                entry.daily_cap = message.daily_cap
+
+        # Buffer-only users never leave memory
+        to_db = [
+            entry for entry in merged.values()
+            if not self.char_buffers.try_buffer(entry.user_id, entry.char_count, entry.char_per_rp, entry.daily_cap)
+        ]
+
+        if to_db:
+            tickets = {}
+            for entry in to_db:
+                tickets[entry.user_id] = await self.char_buffers.begin_sync(entry.user_id)
+
+            try:
+                results = await self.db.process_rp_batch(
+                    [entry.user_id for entry in to_db],
+                    [entry.char_count + tickets[entry.user_id]['pending'] for entry in to_db],
+                    [tickets[entry.user_id]['local_date'] for entry in to_db],
+                    [entry.char_per_rp for entry in to_db],
+                    [entry.daily_cap for entry in to_db]
+                )
+                by_user = {result['user_id']: result for result in results}
+            except Exception as e:
+                # One bad row shouldn't cost the whole batch: fall back to per-user calls,
+                # each keeping its ticket's pending delta
+                self.errors += 1
+                logger.error(f"RP batch of {len(to_db)} users failed, applying individually: {e}")
+                by_user = {}
+                for entry in to_db:
+                    try:
+                        by_user[entry.user_id] = await self.char_buffers.run_sync(
+                            entry.user_id, tickets[entry.user_id], entry.char_count,
+                            entry.char_per_rp, entry.daily_cap
+                        )
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Failed to process RP for user {entry.user_id} ({entry.merged} messages): {e}")
+                tickets = {}
+
+            for entry in to_db:
+                result = by_user.get(entry.user_id)
+                if entry.user_id in tickets:
+                    self.char_buffers.end_sync(entry.user_id, tickets[entry.user_id], result)
+                if result and result['leveled_up']:
+                    self.notifications.enqueue(LevelUpEvent(
+                        user_id=entry.user_id,
+                        character_name=result['character_name'],
+                        old_level=result['old_level'],
+                        new_level=result['new_level'],
+                        new_xp=result['new_xp'],
+                        source="Roleplay Activity",
+                        image_url=result.get('image_url'),
+                        character_sheet_url=result.get('character_sheet_url')
+                    ))
+
+        # Metrics
+        now = time.monotonic()
+        lag = now - min(message.received_at for message in batch)
+        self.batches += 1
+        self.last_batch_size = message_count
+        self.max_batch_size = max(self.max_batch_size, message_count)
+        self.total_batch_messages += message_count
+        self.db_rows += len(to_db)
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+        self.lag_samples += 1
+
+    def stats(self) -> Dict:
+        """Return pipeline metrics"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'overflow_users': len(self._overflow),
+            'overflow_policy': self.overflow_policy,
+            'submitted': self.submitted,
+            'overflowed': self.overflowed,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'errors': self.errors,
+            'last_batch_size': self.last_batch_size,
+            'avg_batch_size': (self.total_batch_messages / self.batches) if self.batches else None,
+            'max_batch_size': self.max_batch_size,
+            'db_rows': self.db_rows,
+            'last_lag': self.last_lag,
+            'avg_lag': (self.total_lag / self.lag_samples) if self.lag_samples else None,
+            'max_lag': self.max_lag
+        }
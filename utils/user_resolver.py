@@ -0,0 +1,89 @@
+"""
+Cached Discord user resolution for XP Bot
+"""
+import asyncio
+import logging
+from typing import Dict
+import discord
+from utils.cache import TTLCache
+
+logger = logging.getLogger('xp-bot')
+
+# Fetched users kept for DMs and mentions (entries, seconds)
+USER_CACHE_SIZE = 2000
+USER_CACHE_TTL = 3600
+
+
+class UserResolver:
+    """
+    Resolves user IDs to discord.User objects with as few REST calls as possible.
+
+    Order: the gateway cache (bot.get_user), then a TTL LRU of users we fetched before,
+    then bot.fetch_user. Concurrent lookups for the same ID share one in-flight request.
+    """
+
+    def __init__(self, bot, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.bot = bot
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: Dict[int, asyncio.Future] = {}
+
+        # Metrics
+        self.gateway_hits = 0
+        self.coalesced = 0
+        self.rest_calls = 0
+        self.rest_errors = 0
+
+    async def resolve(self, user_id: int) -> discord.User:
+        """Return the user, raising discord.NotFound/HTTPException like bot.fetch_user"""
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.gateway_hits += 1
+            return user
+
+        user = self._cache.get(user_id)
+        if user is not None:
+            return user
+
+        pending = self._in_flight.get(user_id)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._in_flight[user_id] = pending
+        try:
+            self.rest_calls += 1
+            user = await self.bot.fetch_user(user_id)
+        except BaseException as e:
+            self.rest_errors += 1
+            if isinstance(e, Exception):
+                pending.set_exception(e)
+                # Mark retrieved so an uncoalesced failure isn't reported as never awaited
+                pending.exception()
+            else:
+                pending.cancel()
+            raise
+        else:
+            self._cache.set(user_id, user)
+            pending.set_result(user)
+            return user
+        finally:
+            self._in_flight.pop(user_id, None)
+
+    def invalidate(self, user_id: int):
+        """Forget a fetched user"""
+        self._cache.pop(user_id)
+
+    def stats(self) -> Dict:
+        """Return resolution metrics"""
+        cache = self._cache.stats()
+        lookups = self.gateway_hits + cache['hits'] + cache['misses']
+        return {
+            'size': cache['size'],
+            'gateway_hits': self.gateway_hits,
+            'cache_hits': cache['hits'],
+            'coalesced': self.coalesced,
+            'rest_calls': self.rest_calls,
+            'rest_errors': self.rest_errors,
+            'hit_rate': ((lookups - self.rest_calls) / lookups) if lookups else 0.0
+        }
@@ -1,7 +1,7 @@
 """
 XP calculation and level progression utilities
 """
-from datetime import datetime
+from datetime import date, datetime, time, timedelta, timezone
 from zoneinfo import ZoneInfo
 
 # XP/Level config
@@ -31,29 +31,20 @@ def get_level_and_progress(xp):
     return level, progress, required
 
 
-async def should_reset_xp(db, user_id: int):
-    """Check if user needs daily XP reset"""
-    now_utc = datetime.utcnow()
-    tz = await db.get_user_timezone(user_id)
+def get_local_date(tz: str) -> date:
+    """Today's date in the given IANA timezone (falls back to UTC for unknown zones)"""
+    now_utc = datetime.now(timezone.utc)
     try:
-        user_time = now_utc.astimezone(ZoneInfo(tz))
+        return now_utc.astimezone(ZoneInfo(tz)).date()
     except Exception:
-        user_time = now_utc
-    today_local = user_time.date()
+        return now_utc.date()
 
-    last_reset = await db.get_last_xp_reset(user_id)
-    return last_reset != today_local
 
-
-async def perform_daily_reset(db, user_id: int):
-    """Perform daily reset for a user"""
-    await db.reset_daily_caps(user_id)
-
-    now_utc = datetime.utcnow()
-    tz = await db.get_user_timezone(user_id)
+def get_next_local_midnight(tz: str) -> datetime:
+    """Next local midnight in the given timezone, as an aware UTC datetime"""
     try:
-        user_time = now_utc.astimezone(ZoneInfo(tz))
+        zone = ZoneInfo(tz)
     except Exception:
-        user_time = now_utc
-
-    await db.update_last_xp_reset(user_id, user_time.date())
+        zone = timezone.utc
+    tomorrow = get_local_date(tz) + timedelta(days=1)
+    return datetime.combine(tomorrow, time(0), tzinfo=zone).astimezone(timezone.utc)